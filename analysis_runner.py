@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# "0" runs audio then video like before
+PARALLEL_ANALYSIS = os.environ.get("PARALLEL_ANALYSIS", "1") != "0"
+AUDIO_TIMEOUT = float(os.environ.get("AUDIO_TIMEOUT", 120))
+VIDEO_TIMEOUT = float(os.environ.get("VIDEO_TIMEOUT", 120))
+
+# two branches per request, sized for gunicorn's --threads 2
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("ANALYSIS_WORKERS", 4)),
+    thread_name_prefix="analysis",
+)
+
+class BranchTimeout(Exception):
+    def __init__(self, branch, timeout):
+        super().__init__(f"{branch} analysis timed out after {timeout:g}s")
+        self.branch = branch
+
+def analyze(process_audio, audio_input, process_video, video_path,
+            audio_timeout=AUDIO_TIMEOUT, video_timeout=VIDEO_TIMEOUT,
+            parallel=PARALLEL_ANALYSIS, audio_fallback=None):
+    '''
+    runs transcription and video analysis, in parallel unless disabled.
+    audio_input is passed through to process_audio as-is.
+    process_video must accept a `cancel` event.
+    returns (audio_result, video_result, timings), each result being
+    whatever its branch returned.
+    an audio timeout becomes an error transcription like any other whisper
+    failure, passed through audio_fallback when the audio branch returns
+    more than the text; a video timeout raises BranchTimeout after
+    cancelling the branch.
+    '''
+    cancel = threading.Event()
+    timings = {}
+
+    def timed(name, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            timings[name] = round(time.perf_counter() - t0, 4)
+
+    if not parallel:
+        audio_result = timed("audio", process_audio, audio_input)
+        video_result = timed("video", process_video, video_path, cancel=cancel)
+        return audio_result, video_result, timings
+
+    start = time.perf_counter()
+    audio_future = _executor.submit(timed, "audio", process_audio, audio_input)
+    video_future = _executor.submit(timed, "video", process_video, video_path, cancel=cancel)
+
+    try:
+        video_result = video_future.result(timeout=video_timeout)
+    except FutureTimeout:
+        cancel.set()
+        video_future.cancel()
+        raise BranchTimeout("video", video_timeout)
+    except BaseException:
+        cancel.set()
+        audio_future.cancel()
+        raise
+
+    # the audio branch has been running alongside, only wait for what's left
+    remaining = max(0.0, audio_timeout - (time.perf_counter() - start))
+    try:
+        audio_result = audio_future.result(timeout=remaining)
+    except FutureTimeout:
+        # whisper can't be interrupted mid-decode; drop its result when it lands
+        audio_future.cancel()
+        message = f"Error transcribing audio: {BranchTimeout('audio', audio_timeout)}"
+        audio_result = audio_fallback(message) if audio_fallback else message
+
+    timings["wall"] = round(time.perf_counter() - start, 4)
+    return audio_result, video_result, timings
@@ -1,24 +1,50 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, WebSocket
+from typing import Optional
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import cv2
-import numpy as np
-import mediapipe as mp
-import whisper
-import onnxruntime as ort
+import asyncio
+import json
 import time
 import os
-import tempfile
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent))
-from au_feature import compute_aus
-from metrics import compute_metrics
-from openai_call import interpret_expression
+from startup import readiness, start_warmup, timed
+with timed("import pipeline (cv2, av)"):
+    from video_pipeline import VIDEO_SAMPLING, run_video_pipeline
+    from audio_demux import WHISPER_SAMPLE_RATE, load_audio_track
+    from live_session import AUDIO, LIVE_FRAME_QUEUE, LIVE_MAX_SESSIONS, LIVE_PUSH_INTERVAL, LiveSession
+from analysis_runner import BranchTimeout, analyze
+from vad import NO_SPEECH, trim_silence
+from audio_analyzer import analyze_prosody
+with timed("import openai"):
+    from openai_call import interpret_or_describe, interpret_or_describe_async, stream_interpretation_async
+from llm_gateway import LLMError, gateway
+from rizz_score import describe, rizz_score
+from model_pool import PoolTimeout
+from models import POOL_WAIT, TRANSCRIBER, emotion_pool, face_mesh_pool, live_face_mesh_pool, pool_stats, whisper_pool
+from digests import array_digest, file_digest
+from result_cache import cache_stats, transcription_cache, video_cache, video_key
+from uploads import MAX_AUDIO_BYTES, MAX_LANDMARK_BYTES, MAX_REQUEST_BYTES, MAX_VIDEO_BYTES, UploadTooLarge, save_upload
+from feature_engine import average_landmark_payload
+from landmark_codec import LandmarkPayloadError
+from jobs import DONE, FAILED, JobFailed, QueueFull, make_job_backend
 
-app = FastAPI()
+# each request checks out its own FaceMesh/whisper/onnx instance from the pools.
+# the pools load lazily; warm-up fills them after startup so boot doesn't wait
+MODEL_POOLS = (face_mesh_pool, emotion_pool, whisper_pool)
+
+@asynccontextmanager
+async def lifespan(app):
+    start_warmup(MODEL_POOLS)
+    yield
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -29,75 +55,290 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize models
-print("Loading models...")
-whisper_model = whisper.load_model("tiny.en")
-emotion_session = ort.InferenceSession("emotion.onnx")
-input_name = emotion_session.get_inputs()[0].name
-output_name = emotion_session.get_outputs()[0].name
-mp_face = mp.solutions.face_mesh
-face_mesh = mp_face.FaceMesh(max_num_faces=1, refine_landmarks=True)
-print("Models loaded!")
-
-def avg_dict_list(dict_list):
-    if not dict_list:
-        return {}
-    keys = dict_list[0].keys()
-    return {
-        k: float(np.mean([d[k] for d in dict_list]))
-        for k in keys
-    }
-
-def process_video(video_path):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        return None, None
-    
-    session_data = {"aus": [], "metrics": [], "timestamps": []}
-    start_time = time.time()
-    frame_count = 0
+@app.middleware("http")
+async def reject_oversized_uploads(request, call_next):
+    # refuse before the multipart body is parsed or spooled anywhere
+    length = request.headers.get("content-length", "")
+    if request.method == "POST" and length.isdigit() and int(length) > MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={"error": "Upload too large"})
+    return await call_next(request)
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(request, exc):
+    return JSONResponse(status_code=413, content={"error": str(exc)})
+
+# heavy per-request work (whisper, decode, face mesh) runs here, never on the
+# event loop; requests past the limit wait on the semaphore instead of piling
+# more threads onto the CPU
+MAX_CONCURRENT_JOBS = int(os.environ.get("MAX_CONCURRENT_JOBS", 2))
+inference_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS, thread_name_prefix="inference")
+job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+# long analyses can run as background jobs: POST /jobs, then poll /jobs/{id}
+job_queue = make_job_backend()
+
+# an open /jobs/{id}/events stream parks a default-executor thread in
+# job_queue.wait, and that executor also runs every asyncio.to_thread here
+# (live prosody included), so only this many at once; the rest get a 503
+# and poll /jobs/{id} instead
+JOB_EVENT_STREAMS = int(os.environ.get("JOB_EVENT_STREAMS", 4))
+event_streams = asyncio.Semaphore(JOB_EVENT_STREAMS)
+
+# open /live websockets. their frames run on their own threads with their own
+# FaceMesh pool, so sessions holding a mesh can't deadlock against uploads
+# waiting on inference_executor for one
+live_slots = asyncio.Semaphore(LIVE_MAX_SESSIONS)
+live_executor = ThreadPoolExecutor(max_workers=LIVE_MAX_SESSIONS, thread_name_prefix="live")
+
+def process_video(video_path, cancel=None):
+    # resubmitted clips (retries, double clicks) skip decode and face mesh
+    key = video_key(file_digest(video_path), VIDEO_SAMPLING)
+    cached = video_cache.get(key)
+    if cached is not None:
+        return cached
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        if frame_count % 5 != 0:
+    # bounded waits: a busy server answers 503 instead of parking the request
+    with face_mesh_pool.checkout(POOL_WAIT) as face_mesh, emotion_pool.checkout(POOL_WAIT) as emotion_session:
+        avg_aus, avg_metrics, emotions, stats = run_video_pipeline(
+            video_path, face_mesh, cancel=cancel, emotion_session=emotion_session, **VIDEO_SAMPLING
+        )
+    print(f"video pipeline: {stats}")
+    if avg_aus is not None:
+        video_cache.set(key, (avg_aus, avg_metrics, emotions))
+    return avg_aus, avg_metrics, emotions
+
+def process_landmarks(landmarks_path, cancel=None):
+    # browser-side face mesh: no decode, no mediapipe, just the feature math
+    with open(landmarks_path, "rb") as f:
+        avg_aus, avg_metrics = average_landmark_payload(f.read())
+    return avg_aus, avg_metrics, None
+
+ANALYZERS = {"video": process_video, "landmarks": process_landmarks}
+
+async def save_uploads(video, audio, landmarks=None):
+    '''
+    save the request's files; returns (media_path, audio_path, kind) with
+    media_path the video, or the landmark payload when kind is "landmarks"
+    '''
+    # chunked copy to disk; the whole upload is never held in memory
+    if landmarks is not None:
+        media_path = await save_upload(landmarks, "landmarks", MAX_LANDMARK_BYTES, suffix=".lmk")
+        kind = "landmarks"
+    elif video is not None:
+        media_path = await save_upload(video, "video", MAX_VIDEO_BYTES)
+        kind = "video"
+    else:
+        raise HTTPException(status_code=400, detail="Missing video or landmarks file")
+    audio_path = None
+    # audio is optional when the video has its own audio track
+    if audio is not None:
+        try:
+            audio_path = await save_upload(audio, "audio", MAX_AUDIO_BYTES)
+        except BaseException:
+            remove_files(media_path)
+            raise
+    return media_path, audio_path, kind
+
+def remove_files(*paths):
+    for path in paths:
+        if path is None:
             continue
-        
-        frame = cv2.flip(frame, 1)
-        results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        if results.multi_face_landmarks:
-            landmarks = results.multi_face_landmarks[0].landmark
-            aus = compute_aus(landmarks, frame.shape[1], frame.shape[0])
-            metrics = compute_metrics(landmarks, frame.shape[1], frame.shape[0])
-            
-            if isinstance(aus, dict) and isinstance(metrics, dict):
-                session_data["aus"].append(aus)
-                session_data["metrics"].append(metrics)
-                session_data["timestamps"].append(time.time() - start_time)
-    
-    cap.release()
-    
-    if not session_data["aus"]:
-        return None, None
-    
-    return avg_dict_list(session_data["aus"]), avg_dict_list(session_data["metrics"])
+        try:
+            os.unlink(path)
+        except:
+            pass
 
-def process_audio(audio_path):
+def process_audio(audio):
+    # audio: a file path, or a 16 kHz float32 array already decoded in-process
+    digest = file_digest(audio) if isinstance(audio, str) else array_digest(audio)
+    key = f"{TRANSCRIBER}-{digest}"
+    cached = transcription_cache.get(key)
+    if cached is not None:
+        return cached
     try:
-        result = whisper_model.transcribe(audio_path, fp16=False, without_timestamps=True)
-        return result["text"].strip() or "No speech detected."
+        if isinstance(audio, str):
+            # decode here so VAD can see it; whisper gets the path if PyAV can't
+            decoded = load_audio_track(audio)
+            if decoded is not None:
+                audio = decoded
+        if not isinstance(audio, str):
+            audio = trim_silence(audio)
+            if audio is None:
+                # nothing voiced: don't wake the model up for it
+                transcription_cache.set(key, NO_SPEECH)
+                return NO_SPEECH
+        with whisper_pool.checkout() as transcriber:
+            text = transcriber.transcribe(audio)
+        transcription = text or NO_SPEECH
+        transcription_cache.set(key, transcription)
+        return transcription
     except Exception as e:
         return f"Error: {str(e)}"
 
+def process_audio_upload(video_path, audio_path=None):
+    '''(transcription, prosody) for a request; prosody is None if the audio can't be decoded'''
+    # the browser's webm carries its own audio track: demux it in-process and
+    # skip both the separate audio upload and whisper's ffmpeg subprocess
+    audio = load_audio_track(video_path) if video_path is not None else None
+    if audio is None:
+        if audio_path is None:
+            return "No audio track found.", None
+        audio = load_audio_track(audio_path)
+        if audio is None:
+            return process_audio(audio_path), None
+    return process_audio(audio), analyze_prosody(audio, WHISPER_SAMPLE_RATE)
+
+def audio_timeout_result(message):
+    return message, None
+
 # Serve static files from web/web directory
 static_path = Path(__file__).parent / "web" / "web"
 if static_path.exists():
     app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+async def ready():
+    is_ready, payload = readiness(MODEL_POOLS)
+    return JSONResponse(status_code=200 if is_ready else 503, content=payload)
+
+@app.get("/stats")
+async def stats():
+    return {"pools": pool_stats(), "jobs": job_queue.stats(), "caches": cache_stats(), "llm": gateway.stats()}
+
+@app.post("/jobs", status_code=202)
+async def submit_job(video: Optional[UploadFile] = File(None), audio: Optional[UploadFile] = File(None),
+                     landmarks: Optional[UploadFile] = File(None)):
+    media_path, audio_path, kind = await save_uploads(video, audio, landmarks)
+    try:
+        job_id = job_queue.submit(run_analysis_job, media_path, audio_path, kind)
+    except QueueFull as e:
+        remove_files(media_path, audio_path)
+        return JSONResponse(
+            status_code=503,
+            content={"error": f"Server busy: {e}"},
+            headers={"Retry-After": "5"},
+        )
+    return {"job_id": job_id, "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = job_queue.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    if job_queue.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if event_streams.locked():
+        return JSONResponse(status_code=503, content={"error": "Too many event streams, poll /jobs/{id}"},
+                            headers={"Retry-After": "5"})
+    await event_streams.acquire()
+
+    async def stream():
+        # one server-sent event per status change, until the job finishes;
+        # a quiet wait ends in a comment line that only keeps proxies from
+        # closing the connection
+        try:
+            last = None
+            while True:
+                job = await asyncio.to_thread(job_queue.wait, job_id, 15)
+                if job is None:
+                    return
+                if job["status"] == last:
+                    yield ": keepalive\n\n"
+                    continue
+                last = job["status"]
+                yield f"data: {json.dumps(job)}\n\n"
+                if job["status"] in (DONE, FAILED):
+                    return
+        finally:
+            event_streams.release()
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.websocket("/live")
+async def live(websocket: WebSocket):
+    '''
+    streaming analysis. the client sends binary messages tagged per
+    live_session (JPEG frames or landmark records, and PCM audio) and gets
+    {"type": "metrics"} pushes back; a {"type": "end"} text message, or
+    hitting LIVE_MAX_SECONDS, finishes the session with a {"type": "result"}
+    message carrying the same fields as /process.
+    '''
+    if live_slots.locked():
+        # 1013: try again later
+        await websocket.close(code=1013)
+        return
+    async with live_slots:
+        await websocket.accept()
+        loop = asyncio.get_running_loop()
+        session = LiveSession(live_face_mesh_pool)
+        frame_q = asyncio.Queue(maxsize=LIVE_FRAME_QUEUE)
+
+        async def analyze_frames():
+            last_push = 0.0
+            while True:
+                message = await frame_q.get()
+                if message is None:
+                    return
+                await loop.run_in_executor(live_executor, session.process, message)
+                if time.monotonic() - last_push >= LIVE_PUSH_INTERVAL:
+                    last_push = time.monotonic()
+                    await websocket.send_json(session.rolling())
+
+        worker = asyncio.create_task(analyze_frames())
+        try:
+            while not session.expired():
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    return
+                if message.get("bytes"):
+                    data = message["bytes"]
+                    if data[0] == AUDIO:
+                        session.add_audio(data[1:])
+                    else:
+                        session.offer(frame_q, data)
+                elif message.get("text") and json.loads(message["text"]).get("type") == "end":
+                    break
+                if worker.done():
+                    # surfaces a failed frame (bad payload, send error) here
+                    worker.result()
+
+            # finish what's queued, then transcribe and interpret once
+            await frame_q.put(None)
+            await worker
+            audio = session.audio()
+            transcription, prosody = "No audio received.", None
+            if audio is not None:
+                transcription, prosody = await asyncio.gather(
+                    loop.run_in_executor(inference_executor, process_audio, audio),
+                    asyncio.to_thread(analyze_prosody, audio, WHISPER_SAMPLE_RATE),
+                )
+            avg_aus, avg_metrics = session.averages()
+            result = {"type": "result", "transcription": transcription, "prosody": prosody}
+            if avg_aus is None:
+                result["error"] = "No face detected"
+            else:
+                score = rizz_score(avg_aus, avg_metrics, prosody)
+                result.update(
+                    analysis=await interpret_or_describe_async(avg_aus, avg_metrics, score),
+                    score=score,
+                    aus=avg_aus,
+                    metrics=avg_metrics,
+                    frames=session.rolling()["frames"],
+                )
+            await websocket.send_json(result)
+            await websocket.close()
+        finally:
+            worker.cancel()
+            session.close()
+
 @app.get("/")
 def root():
     index_path = Path(__file__).parent / "web" / "web" / "index.html"
@@ -112,46 +353,146 @@ def serve_static(path: str):
         return FileResponse(str(file_path))
     raise HTTPException(status_code=404, detail="File not found")
 
+async def analyze_uploads(media_path, audio_path, kind):
+    '''
+    both analysis branches for saved uploads, off the event loop. returns
+    (payload, error): the /process fields minus "analysis", or a response to
+    send instead.
+    '''
+    loop = asyncio.get_running_loop()
+    try:
+        async with job_slots:
+            (transcription, prosody), (avg_aus, avg_metrics, emotions), timings = await loop.run_in_executor(
+                inference_executor, partial(analyze, audio_fallback=audio_timeout_result),
+                partial(process_audio_upload, media_path if kind == "video" else None), audio_path,
+                ANALYZERS[kind], media_path,
+            )
+    except BranchTimeout as e:
+        return None, JSONResponse(status_code=504, content={"error": str(e)})
+    except PoolTimeout as e:
+        return None, JSONResponse(status_code=503, content={"error": f"Server busy: {e}"},
+                                  headers={"Retry-After": "5"})
+    except LandmarkPayloadError as e:
+        return None, JSONResponse(status_code=400, content={"error": str(e)})
+    print(f"analysis timings: {timings}")
+    
+    if avg_aus is None:
+        return None, JSONResponse(
+            status_code=400,
+            content={"error": "No face detected", "transcription": transcription}
+        )
+    
+    return {
+        "transcription": transcription,
+        "aus": avg_aus,
+        "metrics": avg_metrics,
+        "emotion": emotions,
+        "prosody": prosody,
+        "score": rizz_score(avg_aus, avg_metrics, prosody)
+    }, None
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post("/process")
-async def process(video: UploadFile = File(...), audio: UploadFile = File(...)):
+async def process(video: Optional[UploadFile] = File(None), audio: Optional[UploadFile] = File(None),
+                  landmarks: Optional[UploadFile] = File(None), interpret: bool = True):
+    '''
+    video (webm, audio track included) and/or audio uploads, or `landmarks`:
+    landmark_codec records from a browser-side face mesh, which skips video
+    decode and face mesh on the server entirely.
+
+    "score" is computed locally; ?interpret=false skips the LLM and answers
+    with the score's one-line reading as the "analysis"
+    '''
     try:
-        # Save files temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as video_temp:
-            video_path = video_temp.name
-            content = await video.read()
-            video_temp.write(content)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as audio_temp:
-            audio_path = audio_temp.name
-            content = await audio.read()
-            audio_temp.write(content)
+        media_path, audio_path, kind = await save_uploads(video, audio, landmarks)
+        try:
+            payload, error = await analyze_uploads(media_path, audio_path, kind)
+        finally:
+            remove_files(media_path, audio_path)
+        if error is not None:
+            return error
         
+        if interpret:
+            payload["analysis"] = await interpret_or_describe_async(payload["aus"], payload["metrics"], payload["score"])
+        else:
+            payload["analysis"] = describe(payload["score"])
+        return payload
+    except (UploadTooLarge, HTTPException):
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/process/stream")
+async def process_stream(video: Optional[UploadFile] = File(None), audio: Optional[UploadFile] = File(None),
+                         landmarks: Optional[UploadFile] = File(None)):
+    '''
+    /process as server-sent events: "features" with everything but the
+    analysis as soon as it's ready, "token" events as the LLM writes, then
+    "done" with the full analysis. failures before the stream starts get the
+    same responses as /process. if the LLM fails before its first token,
+    "done" carries the local score's reading instead; a failure mid-stream
+    is an "error" event.
+    '''
+    try:
+        media_path, audio_path, kind = await save_uploads(video, audio, landmarks)
         try:
-            transcription = process_audio(audio_path)
-            avg_aus, avg_metrics = process_video(video_path)
-            
-            if avg_aus is None:
-                return JSONResponse(
-                    status_code=400,
-                    content={"error": "No face detected", "transcription": transcription}
-                )
-            
-            analysis = interpret_expression(avg_aus, avg_metrics)
-            
-            return {
-                "transcription": transcription,
-                "analysis": analysis,
-                "aus": avg_aus,
-                "metrics": avg_metrics
-            }
+            payload, error = await analyze_uploads(media_path, audio_path, kind)
         finally:
-            try:
-                os.unlink(video_path)
-                os.unlink(audio_path)
-            except:
-                pass
+            remove_files(media_path, audio_path)
+    except (UploadTooLarge, HTTPException):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if error is not None:
+        return error
+
+    async def events():
+        yield sse("features", payload)
+        parts = []
+        try:
+            async for delta in stream_interpretation_async(payload["aus"], payload["metrics"]):
+                parts.append(delta)
+                yield sse("token", {"text": delta})
+        except LLMError as e:
+            if parts:
+                yield sse("error", {"error": str(e)})
+                return
+            print(f"LLM unavailable, using the local score: {e}")
+            parts = [describe(payload["score"])]
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+            return
+        yield sse("done", {"analysis": "".join(parts)})
+
+    # X-Accel-Buffering: proxies would otherwise hold tokens back
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def run_analysis_job(media_path, audio_path, kind="video"):
+    # runs on a job worker thread, so the sync LLM client is fine here
+    try:
+        (transcription, prosody), (avg_aus, avg_metrics, emotions), timings = analyze(
+            partial(process_audio_upload, media_path if kind == "video" else None), audio_path,
+            ANALYZERS[kind], media_path,
+            audio_fallback=audio_timeout_result,
+        )
+        print(f"job analysis timings: {timings}")
+        if avg_aus is None:
+            raise JobFailed("No face detected", {"error": "No face detected", "transcription": transcription})
+        score = rizz_score(avg_aus, avg_metrics, prosody)
+        return {
+            "transcription": transcription,
+            "analysis": interpret_or_describe(avg_aus, avg_metrics, score),
+            "aus": avg_aus,
+            "metrics": avg_metrics,
+            "emotion": emotions,
+            "prosody": prosody,
+            "score": score
+        }
+    finally:
+        remove_files(media_path, audio_path)
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,5 +1,4 @@
 import numpy as np
-import cv2
 
 LEFT_EYE_TOP = 159
 LEFT_EYE_BOTTOM = 145
@@ -23,85 +22,101 @@ LOWER_LIP = 14
 CHIN = 152
 MID_FACE = 1
 
-def dist(a, b):
-    return np.linalg.norm(np.array(a) - np.array(b))
+AU_NAMES = (
+    "AU01", "AU02", "AU04", "AU06", "AU07", "AU09", "AU10", "AU12",
+    "AU14", "AU17", "AU23", "AU24", "AU25", "AU26", "AU45",
+)
 
-def get_point(lm, idx, w, h):
-    return (lm[idx].x * w, lm[idx].y * h)
+def landmarks_to_array(landmarks, dtype=np.float32):
+    # mediapipe NormalizedLandmark list -> (n_points, 3) array
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=dtype)
 
-def compute_aus(landmarks, w, h):
-    aus = {}
+def _frame_scale(v):
+    # scalar w/h, or one value per frame
+    v = np.asarray(v, dtype=np.float64)
+    return v[:, None] if v.ndim == 1 else v
+
+def _dist(a, b):
+    d = a - b
+    return np.sqrt(d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1])
 
-    li = get_point(landmarks, LEFT_EYEBROW_INNER, w, h)
-    ri = get_point(landmarks, RIGHT_EYEBROW_INNER, w, h)
+def compute_aus_batch(points, w, h):
+    '''
+    points: (n_frames, n_landmarks, 2 or 3) normalized landmark array
+    w, h: frame size, scalar or one per frame
+    returns (n_frames, len(AU_NAMES)) float64 array, columns in AU_NAMES order
+    '''
+    points = np.asarray(points)
+    if points.ndim == 2:
+        points = points[None]
 
-    lo = get_point(landmarks, LEFT_EYEBROW_OUTER, w , h)
-    ro = get_point(landmarks, RIGHT_EYEBROW_OUTER, w, h)
+    xy = np.empty(points.shape[:2] + (2,), dtype=np.float64)
+    xy[..., 0] = points[..., 0] * _frame_scale(w)
+    xy[..., 1] = points[..., 1] * _frame_scale(h)
 
-    eye_top_L = get_point(landmarks, LEFT_EYE_TOP, w, h)
-    eye_bot_L = get_point(landmarks, LEFT_EYE_BOTTOM, w, h)
-    eye_top_R = get_point(landmarks, RIGHT_EYE_TOP, w, h)
-    eye_bot_R = get_point(landmarks, RIGHT_EYE_BOTTOM, w, h)
+    li = xy[:, LEFT_EYEBROW_INNER]
+    lo = xy[:, LEFT_EYEBROW_OUTER]
+    mouthL = xy[:, MOUTH_LEFT]
+    mouthR = xy[:, MOUTH_RIGHT]
+    upperLip = xy[:, UPPER_LIP]
+    chin = xy[:, CHIN]
+    midface = xy[:, MID_FACE]
 
-    noseL = get_point(landmarks, NOSE_WRINKLE_LEFT, w, h)
-    noseR = get_point(landmarks, NOSE_WRINKLE_RIGHT, w, h)
+    out = np.empty((xy.shape[0], len(AU_NAMES)), dtype=np.float64)
 
-    mouthL = get_point(landmarks, MOUTH_LEFT, w, h)
-    mouthR = get_point(landmarks, MOUTH_RIGHT, w, h)
-    upperLip = get_point(landmarks, UPPER_LIP, w, h)
-    lowerLip = get_point(landmarks, LOWER_LIP, w, h)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        face_height = _dist(chin, midface)
 
-    chin = get_point(landmarks, CHIN, w, h)
-    midface = get_point(landmarks, MID_FACE, w, h)
+        eye_avg = (_dist(xy[:, LEFT_EYE_TOP], xy[:, LEFT_EYE_BOTTOM])
+                   + _dist(xy[:, RIGHT_EYE_TOP], xy[:, RIGHT_EYE_BOTTOM]))
+        nose_w = _dist(xy[:, NOSE_WRINKLE_LEFT], xy[:, NOSE_WRINKLE_RIGHT])
+        upper = _dist(upperLip, midface)
+        mouth_w = _dist(mouthL, mouthR)
+        lip_gap = _dist(upperLip, xy[:, LOWER_LIP])
 
-    face_height = dist(chin, midface)
+        # brow raise action unit
+        out[:, 0] = np.fmax(0, midface[:, 1] - li[:, 1] / face_height)
+        out[:, 1] = np.fmax(0, midface[:, 1] - lo[:, 1] / face_height)
 
-    # brow raise action unit
-    aus["AU01"] = max(0, midface[1] - li[1] / face_height)
-    aus["AU02"] = max(0, midface[1]- lo[1] / face_height)
+        # brow lowering
+        out[:, 2] = np.fmax(0, (li[:, 1] - midface[:, 1]) / face_height)
 
-    # brow lowering
-    aus["AU04"] = max(0, (li[1] - midface[1]) / face_height)
+        # cheek raise
+        out[:, 3] = np.fmax(0, (0.04 * face_height - eye_avg) / (0.04 * face_height))
 
-    # cheek raise
-    eye_L = dist(eye_top_L, eye_bot_L)
-    eye_R = dist(eye_top_R, eye_bot_R)
-    eye_avg = (eye_L + eye_R)
-    aus["AU06"] = max(0, (0.04 * face_height - eye_avg) / (0.04 * face_height))
+        # lid tighten
+        out[:, 4] = np.fmax(0, 0.03 * (face_height - eye_avg) / (0.03 * face_height))
 
-    # lid tighten 
-    aus["AU07"] = max(0, 0.03 * (face_height - eye_avg) / (0.03 * face_height))
+        # nose wrinkle
+        out[:, 5] = np.fmax(0, (0.12 * face_height - nose_w) / (0.12 * face_height))
 
-    # nose wrinkle
-    nose_w = dist(noseL, noseR)
-    aus["AU09"] = max(0, (0.12 * face_height - nose_w) / (0.12 * face_height))
+        # upper lip raise
+        out[:, 6] = np.fmax(0, upper / face_height)
 
-    # upper lip raise
-    upper = dist(upperLip, midface)
-    aus["AU10"] = max(0, (upper / face_height))
+        # smile (lip corners pull up)
+        out[:, 7] = mouth_w / face_height
 
-    # smile (lip corners pull up)
-    mouth_w = dist(mouthL, mouthR)
-    aus["AU12"] = mouth_w / face_height
+        # smirk
+        out[:, 8] = np.abs((mouthL[:, 1] - mouthR[:, 1]) / face_height)
 
-    # smirk
-    aus["AU14"] = abs((mouthL[1] - mouthR[1]) / face_height)
+        # chin raise
+        out[:, 9] = (midface[:, 1] - chin[:, 1]) / face_height
 
-    # chin raise
-    aus["AU17"] = (midface[1] - chin[1]) / face_height
+        # lip tighten
+        out[:, 10] = np.fmax(0, (0.02 * face_height - lip_gap) / (0.02 * face_height))
+        out[:, 11] = out[:, 10]
 
-    # lip tighten
-    lip_gap = dist(upperLip, lowerLip)
-    aus["AU23"] = max(0, (0.02 * face_height - lip_gap) / (0.02 * face_height))
-    aus["AU24"] = aus["AU23"]
+        # lips part
+        out[:, 12] = lip_gap / face_height
 
-    # lips part
-    aus["AU25"] = lip_gap / face_height
+        # jaw drop
+        out[:, 13] = (lip_gap * 1.5) / face_height
 
-    # jaw drop
-    aus["AU26"] = (lip_gap * 1.5) / face_height
+        # blink?
+        out[:, 14] = np.fmax(0, (0.015 * face_height - eye_avg) / (0.015 * face_height))
 
-    # blink?
-    aus["AU45"] = max(0, (0.015 * face_height - eye_avg) / (0.015 * face_height))
+    return out
 
-    return aus
+def compute_aus(landmarks, w, h):
+    row = compute_aus_batch(landmarks_to_array(landmarks), w, h)[0]
+    return {name: float(v) for name, v in zip(AU_NAMES, row)}
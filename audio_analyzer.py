@@ -1,30 +1,111 @@
-import librosa
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
-def analyze_audio(audio_data, sr):
+PITCH_FMIN = 80
+PITCH_FMAX = 300
+# yin's absolute threshold on the cumulative mean normalized difference
+YIN_THRESHOLD = 0.15
+# frames quieter than this are treated as silence, never voiced
+SILENCE_RMS = 0.01
+
+def _frames(audio, sr):
+    # long enough to hold two periods of PITCH_FMIN, hop of a quarter frame
+    frame_length = 1 << int(np.ceil(np.log2(2 * sr / PITCH_FMIN)))
+    hop = frame_length // 4
+    if len(audio) < frame_length:
+        audio = np.pad(audio, (0, frame_length - len(audio)))
+    # strided view, no copy until the window multiply
+    return sliding_window_view(audio, frame_length)[::hop], frame_length
+
+def _window_acf(window):
+    acf = np.fft.irfft(np.abs(np.fft.rfft(window, n=2 * len(window))) ** 2)[: len(window) // 2 + 1]
+    return acf / acf[0]
+
+def _yin_pitch(power, window, sr):
+    '''
+    per-frame f0 from the power spectrum of the zero-padded STFT: its inverse
+    is the autocorrelation, which gives yin's difference function directly.
+    returns (f0 with nan for unvoiced frames, aperiodicity)
     '''
+    frame_length = len(window)
+    # undo the taper the analysis window puts on longer lags (Boersma 1993)
+    acf = np.fft.irfft(power, axis=1)[:, : frame_length // 2 + 1] / _window_acf(window)
+    # d(tau) = r(0) + r_tau(0) - 2 r(tau), with the energy term held at r(0)
+    diff = np.maximum(2 * (acf[:, :1] - acf), 0.0)
+    diff[:, 0] = 1.0
+    # cumulative mean normalized difference
+    tau = np.arange(diff.shape[1])
+    cumsum = np.cumsum(diff[:, 1:], axis=1)
+    cmnd = np.ones_like(diff)
+    cmnd[:, 1:] = diff[:, 1:] * tau[1:] / np.maximum(cumsum, 1e-12)
+
+    lo = int(sr / PITCH_FMAX)
+    hi = min(int(sr / PITCH_FMIN), diff.shape[1] - 2)
+    search = cmnd[:, lo : hi + 1]
+    # first dip under the threshold (a local minimum), else the global minimum
+    below = search < YIN_THRESHOLD
+    falling = np.empty_like(below)
+    falling[:, :-1] = search[:, 1:] >= search[:, :-1]
+    falling[:, -1] = True
+    candidates = below & falling
+    first = np.where(candidates.any(axis=1), candidates.argmax(axis=1), search.argmin(axis=1))
+    best = first + lo
+    rows = np.arange(len(best))
+    aperiodicity = cmnd[rows, best]
+
+    # parabolic interpolation around the chosen lag
+    a, b, c = cmnd[rows, best - 1], cmnd[rows, best], cmnd[rows, best + 1]
+    denom = a - 2 * b + c
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(denom == 0, 1, denom), 0.0)
+    f0 = sr / (best + np.clip(shift, -1, 1))
+    f0[aperiodicity >= YIN_THRESHOLD] = np.nan
+    return f0, aperiodicity
+
+def analyze_prosody(audio_data, sr):
+    '''
+    pitch, energy and spectral centroid from a single STFT pass.
     audio_data: numpy array of audio samples
     sr: sample rate
+    returns a dict of plain floats; pitch fields are None if nothing is voiced.
     '''
-    
+    audio = np.asarray(audio_data, dtype=np.float32).reshape(-1)
+    frames, frame_length = _frames(audio, sr)
+    frame_rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
 
-    rms = np.sqrt(np.mean(audio_data**2))
-    
+    # zero-padded to 2x so the autocorrelation from this spectrum isn't circular
+    window = np.hanning(frame_length)
+    spectrum = np.fft.rfft(frames * window, n=2 * frame_length, axis=1)
+    power = spectrum.real ** 2 + spectrum.imag ** 2
 
-    pitch, voiced_flag, voiced_probs = librosa.pyin(
-        audio_data, 
-        fmin=80,
-        fmax=300,
-        sr=sr
-    )
-    avg_pitch = np.nanmean(pitch)
-    
+    magnitude = np.sqrt(power)
+    freqs = np.fft.rfftfreq(2 * frame_length, 1 / sr)
+    total = magnitude.sum(axis=1)
+    audible = frame_rms >= SILENCE_RMS
+    centroid = (magnitude @ freqs) / np.maximum(total, 1e-12)
 
-    centroid = librosa.feature.spectral_centroid(y=audio_data, sr=sr)
-    avg_centroid = float(np.mean(centroid))
-    
-    
-    return format_results(rms, avg_pitch, avg_centroid)
+    f0, _ = _yin_pitch(power, window, sr)
+    f0[~audible] = np.nan
+    voiced = ~np.isnan(f0)
+
+    rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64)))) if audio.size else 0.0
+    return {
+        "duration_seconds": round(len(audio) / sr, 3),
+        "rms": rms,
+        "energy_std": float(np.std(frame_rms)),
+        "pitch_hz": float(np.mean(f0[voiced])) if voiced.any() else None,
+        "pitch_std_hz": float(np.std(f0[voiced])) if voiced.any() else None,
+        "voiced_ratio": float(voiced.mean()),
+        "centroid_hz": float(np.mean(centroid[audible])) if audible.any() else 0.0,
+    }
+
+def analyze_audio(audio_data, sr):
+    '''
+    audio_data: numpy array of audio samples
+    sr: sample rate
+    '''
+    prosody = analyze_prosody(audio_data, sr)
+    pitch = prosody["pitch_hz"] if prosody["pitch_hz"] is not None else np.nan
+    return format_results(prosody["rms"], pitch, prosody["centroid_hz"])
 
 
 def format_results(rms, pitch, centroid):
@@ -0,0 +1,38 @@
+import numpy as np
+
+# whisper.audio.SAMPLE_RATE; whisper takes float32 mono at this rate
+WHISPER_SAMPLE_RATE = 16000
+
+try:
+    import av
+except ImportError:
+    av = None
+
+def load_audio_track(path, sr=WHISPER_SAMPLE_RATE):
+    '''
+    demux and decode the first audio stream of a container (e.g. the browser's
+    webm with an opus track) in-process, resampled to mono float32 at `sr`.
+    returns None if there is no audio stream, it can't be decoded or PyAV
+    isn't installed, so the caller can fall back to a separate audio file.
+    '''
+    if av is None:
+        return None
+    try:
+        with av.open(str(path)) as container:
+            if not container.streams.audio:
+                return None
+            stream = container.streams.audio[0]
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=sr)
+            chunks = []
+            for frame in container.decode(stream):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray().reshape(-1))
+            for out in resampler.resample(None):
+                chunks.append(out.to_ndarray().reshape(-1))
+    except (av.error.FFmpegError, OSError, ValueError, EOFError) as e:
+        # a truncated or garbage upload: PyAV raises these outside FFmpegError too
+        print(f"could not demux audio from {path}: {e}")
+        return None
+    if not chunks:
+        return None
+    return np.concatenate(chunks).astype(np.float32, copy=False)
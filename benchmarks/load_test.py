@@ -0,0 +1,118 @@
+'''
+concurrency load test for /process.
+
+sends one request alone to get a baseline, then N at once while polling
+/health. if the server serializes requests the concurrent wall time is about
+N x baseline and /health stalls behind the uploads; with the async endpoint
+wall time stays well under that and /health keeps answering fast.
+
+    python benchmarks/load_test.py --url http://localhost:8000 --video clip.webm -n 4
+
+start the server with LLM_BACKEND=stub to take OpenAI (cost, rate limits,
+network) out of the measurement.
+'''
+import argparse
+import json
+import mimetypes
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def encode_multipart(files):
+    boundary = uuid.uuid4().hex
+    body = bytearray()
+    for field, path in files.items():
+        path = Path(path)
+        ctype = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        body += f"--{boundary}\r\n".encode()
+        body += f'Content-Disposition: form-data; name="{field}"; filename="{path.name}"\r\n'.encode()
+        body += f"Content-Type: {ctype}\r\n\r\n".encode()
+        body += path.read_bytes()
+        body += b"\r\n"
+    body += f"--{boundary}--\r\n".encode()
+    return bytes(body), f"multipart/form-data; boundary={boundary}"
+
+def post_process(url, body, content_type, timeout):
+    req = urllib.request.Request(url + "/process", data=body, method="POST")
+    req.add_header("Content-Type", content_type)
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return {"status": status, "seconds": time.perf_counter() - t0}
+
+def poll_health(url, stop, samples, interval=0.1):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url + "/health", timeout=30) as resp:
+                resp.read()
+            samples.append(time.perf_counter() - t0)
+        except Exception:
+            samples.append(float("inf"))
+        stop.wait(interval)
+
+def run(url, video, audio, n, timeout):
+    return run_files(url, {"video": video, "audio": audio}, n, timeout)
+
+def run_files(url, files, n, timeout):
+    # files: multipart field -> path, e.g. {"landmarks": ..., "audio": ...}
+    body, ctype = encode_multipart(files)
+
+    baseline = post_process(url, body, ctype, timeout)
+
+    health = []
+    stop = threading.Event()
+    poller = threading.Thread(target=poll_health, args=(url, stop, health), daemon=True)
+    poller.start()
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        results = list(pool.map(lambda _: post_process(url, body, ctype, timeout), range(n)))
+    wall = time.perf_counter() - t0
+
+    stop.set()
+    poller.join()
+
+    latencies = [r["seconds"] for r in results]
+    serial_estimate = baseline["seconds"] * n
+    return {
+        "url": url,
+        "concurrency": n,
+        "baseline_seconds": round(baseline["seconds"], 3),
+        "concurrent_wall_seconds": round(wall, 3),
+        "serial_estimate_seconds": round(serial_estimate, 3),
+        # ~1.0 means requests ran one after another
+        "serialization_ratio": round(wall / serial_estimate, 3) if serial_estimate else None,
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_max": round(max(latencies), 3),
+        "statuses": sorted({r["status"] for r in results} | {baseline["status"]}),
+        "health_checks": len(health),
+        "health_p50_ms": round(statistics.median(health) * 1000, 1) if health else None,
+        "health_max_ms": round(max(health) * 1000, 1) if health else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--audio", default=str(ROOT / "temp_audio.wav"))
+    parser.add_argument("-n", "--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    report = run(args.url.rstrip("/"), args.video, args.audio, args.concurrency, args.timeout)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
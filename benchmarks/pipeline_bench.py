@@ -0,0 +1,181 @@
+'''
+per-stage timings of the analysis pipeline on synthetic workloads.
+
+stages: landmark decode, compute_aus / compute_metrics (per frame, as the
+desktop loop calls them) and compute_features_batch (as the server does),
+rizz_score, process_video (decode / face mesh / features / emotion, from
+the pipeline's own stage timings), process_audio (demux, VAD, prosody,
+transcription) and interpret_expression against the stub LLM, cold and
+cached. result caches are bypassed so every run does the work. a stage
+whose dependency is missing here (mediapipe, whisper, ...) reports its
+error instead of stopping the run.
+
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --durations 2 10 --resolutions 640x480 1280x720 --repeat 5
+'''
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+from pathlib import Path
+
+# before anything imports the gateway: time our side of the call, not OpenAI's
+os.environ.setdefault("LLM_BACKEND", "stub")
+os.environ.setdefault("LLM_STUB_LATENCY", "0")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from workloads import generate, parse_resolution
+
+def summarize(seconds):
+    return {
+        "runs": len(seconds),
+        "min_ms": round(min(seconds) * 1000, 4),
+        "p50_ms": round(statistics.median(seconds) * 1000, 4),
+        "mean_ms": round(statistics.fmean(seconds) * 1000, 4),
+    }
+
+def time_call(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    seconds = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - t0)
+    return summarize(seconds)
+
+def guarded(fn, *args, **kwargs):
+    # a stage that can't run here reports why instead of ending the run
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+def as_mesh_landmarks(points):
+    # what mediapipe hands the desktop loop: objects with .x/.y/.z
+    return [types.SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in points]
+
+def bench_features(payload, repeat):
+    from au_feature import compute_aus
+    from feature_engine import compute_features_batch, split_features
+    from landmark_codec import decode_landmarks
+    from metrics import compute_metrics
+    from rizz_score import rizz_score
+
+    points, widths, heights, _ = decode_landmarks(payload)
+    w, h = int(widths[0]), int(heights[0])
+    mesh = as_mesh_landmarks(points[0])
+    aus, metrics = split_features(compute_features_batch(points, widths, heights).mean(axis=0))
+    return {
+        "frames": len(points),
+        "decode_landmarks": time_call(lambda: decode_landmarks(payload), repeat),
+        "compute_aus_per_frame": time_call(lambda: compute_aus(mesh, w, h), repeat),
+        "compute_metrics_per_frame": time_call(lambda: compute_metrics(mesh, w, h), repeat),
+        "compute_features_batch": time_call(lambda: compute_features_batch(points, widths, heights), repeat),
+        "rizz_score": time_call(lambda: rizz_score(aus, metrics), repeat),
+    }
+
+def bench_interpret(payload, repeat):
+    from feature_engine import average_landmark_payload
+    from llm_gateway import gateway
+    from openai_call import interpret_expression
+
+    aus, metrics = average_landmark_payload(payload)
+    # nudge one value per call so each cold call misses the interpretation cache
+    nudges = iter(range(1, 1 << 30))
+    def cold():
+        interpret_expression(aus, {**metrics, "head_tilt": metrics["head_tilt"] + next(nudges)})
+    return {
+        "backend": gateway.backend.name,
+        "cold": time_call(cold, repeat),
+        "cached": time_call(lambda: interpret_expression(aus, metrics), repeat),
+    }
+
+def bench_audio(path, repeat, transcriber):
+    from audio_analyzer import analyze_prosody
+    from audio_demux import WHISPER_SAMPLE_RATE, load_audio_track
+    from vad import trim_silence
+
+    audio = load_audio_track(path)
+    if audio is None:
+        return {"error": "could not decode audio"}
+    speech = trim_silence(audio)
+    result = {
+        "seconds": round(len(audio) / WHISPER_SAMPLE_RATE, 3),
+        "speech_seconds": round(len(speech) / WHISPER_SAMPLE_RATE, 3) if speech is not None else 0.0,
+        "demux": time_call(lambda: load_audio_track(path), repeat),
+        "vad": time_call(lambda: trim_silence(audio), repeat),
+        "prosody": time_call(lambda: analyze_prosody(audio, WHISPER_SAMPLE_RATE), repeat),
+    }
+    if isinstance(transcriber, dict):
+        result["transcribe"] = transcriber
+    elif speech is not None:
+        result["transcribe"] = guarded(time_call, lambda: transcriber.transcribe(speech), repeat, warmup=0)
+        if "p50_ms" in result["transcribe"]:
+            result["transcribe"]["rtf"] = round(result["transcribe"]["p50_ms"] / 1000 / result["speech_seconds"], 4)
+    return result
+
+def bench_video(path, repeat, face_mesh, emotion_session):
+    from video_pipeline import run_video_pipeline
+
+    runs, stats = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        avg_aus, _, _, stats = run_video_pipeline(path, face_mesh, emotion_session=emotion_session)
+        runs.append(time.perf_counter() - t0)
+    return {**summarize(runs), "face_found": avg_aus is not None, "last_run": stats}
+
+def run(manifest, repeat=3, transcribe=True):
+    '''stage timings for a workloads.generate() manifest'''
+    results = {"features": {}, "interpret": None, "audio": {}, "video": {}}
+    for label, path in manifest["landmarks"].items():
+        payload = Path(path).read_bytes()
+        results["features"][label] = guarded(bench_features, payload, max(repeat, 20))
+    if manifest["landmarks"]:
+        payload = Path(next(iter(manifest["landmarks"].values()))).read_bytes()
+        results["interpret"] = guarded(bench_interpret, payload, max(repeat, 20))
+
+    if transcribe:
+        from transcription import load_backend
+        transcriber = guarded(load_backend)
+    else:
+        transcriber = {"skipped": True}
+    for label, path in manifest["wav"].items():
+        results["audio"][label] = guarded(bench_audio, path, repeat, transcriber)
+
+    if manifest["webm"]:
+        from models import make_emotion_session, make_face_mesh
+        face_mesh = guarded(make_face_mesh)
+        emotion_session = guarded(make_emotion_session)
+        if isinstance(emotion_session, dict):
+            # the pipeline runs without emotion; note why
+            results["video"]["emotion_session"] = emotion_session
+            emotion_session = None
+        for label, path in manifest["webm"].items():
+            if isinstance(face_mesh, dict):
+                results["video"][label] = face_mesh
+                continue
+            results["video"][label] = guarded(bench_video, path, repeat, face_mesh, emotion_session)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[2, 5])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(320, 240), (640, 480)])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-video", action="store_true", help="skip webm generation and process_video")
+    parser.add_argument("--no-transcribe", action="store_true", help="skip loading the transcription model")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rizz-bench-") as workdir:
+        manifest = generate(workdir, args.durations, args.resolutions, video=not args.no_video)
+        results = run(manifest, args.repeat, transcribe=not args.no_transcribe)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
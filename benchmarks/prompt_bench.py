@@ -0,0 +1,118 @@
+'''
+compare the legacy and compact LLM prompts on tokens and latency.
+
+input tokens are counted for every variant (tiktoken's encoding for the
+model when installed, otherwise ~4 characters per token). with --calls N
+each variant is also sent N times through the gateway, reporting latency
+percentiles and output tokens; the interpretation cache is bypassed so
+every call reaches the backend. LLM_BACKEND=stub runs it offline.
+
+    python benchmarks/prompt_bench.py
+    python benchmarks/prompt_bench.py --calls 5 --features features.json
+'''
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from au_feature import AU_NAMES
+from llm_gateway import LLM_MODEL, gateway
+from metrics import METRIC_NAMES
+from prompts import LLM_MAX_TOKENS, build_request
+
+VARIANTS = {
+    "legacy": {"prompt": "legacy", "output": "text"},
+    "compact-text": {"prompt": "compact", "output": "text"},
+    "compact-json": {"prompt": "compact", "output": "json"},
+}
+
+def token_counter(model):
+    try:
+        import tiktoken
+    except ImportError:
+        return "chars/4", lambda text: max(1, round(len(text) / 4))
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return encoding.name, lambda text: len(encoding.encode(text))
+
+def request_tokens(request, count):
+    # message text plus ~4 tokens of chat framing per message; the schema
+    # is sent alongside and billed as input too
+    tokens = sum(count(m["content"]) + 4 for m in request["messages"])
+    if "response_format" in request:
+        tokens += count(json.dumps(request["response_format"]))
+    return tokens
+
+def synthetic_features(seed=0):
+    # full float precision, as feature_engine hands them over
+    rng = np.random.default_rng(seed)
+    aus = {name: float(v) for name, v in zip(AU_NAMES, rng.uniform(0, 1, len(AU_NAMES)))}
+    metrics = {name: float(v) for name, v in zip(METRIC_NAMES, rng.uniform(-1, 1, len(METRIC_NAMES)))}
+    return aus, metrics
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+def bench_variant(aus, metrics, options, calls, count):
+    request = build_request(aus, metrics, **options)
+    result = {
+        "input_tokens": request_tokens(request, count),
+        "system_tokens": count(request["messages"][0]["content"]) if len(request["messages"]) > 1 else 0,
+        "max_tokens": request.get("max_tokens"),
+    }
+    latencies, output_tokens = [], []
+    for _ in range(calls):
+        start = time.perf_counter()
+        reply = gateway.complete(request)
+        latencies.append(time.perf_counter() - start)
+        output_tokens.append(count(reply))
+    if calls:
+        result.update({
+            "calls": calls,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p90": percentile(latencies, 90),
+            "output_tokens_mean": float(np.mean(output_tokens)),
+        })
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--features", type=Path, help='JSON file {"aus": {...}, "metrics": {...}}')
+    parser.add_argument("--calls", type=int, default=0, help="LLM calls per variant (default: token counts only)")
+    parser.add_argument("--variants", nargs="+", default=list(VARIANTS), choices=list(VARIANTS))
+    parser.add_argument("--model", default=LLM_MODEL, help="model whose tokenizer to count with")
+    args = parser.parse_args()
+
+    if args.features:
+        features = json.loads(args.features.read_text())
+        aus, metrics = features["aus"], features["metrics"]
+    else:
+        aus, metrics = synthetic_features()
+
+    tokenizer, count = token_counter(args.model)
+    results = {}
+    for name in args.variants:
+        results[name] = bench_variant(aus, metrics, VARIANTS[name], args.calls, count)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    baseline = results.get("legacy")
+    if baseline:
+        for name, result in results.items():
+            result["input_tokens_vs_legacy"] = result["input_tokens"] / baseline["input_tokens"]
+
+    print(json.dumps({
+        "tokenizer": tokenizer,
+        "backend": gateway.backend.name,
+        "default_max_tokens": LLM_MAX_TOKENS,
+        "results": results,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+'''
+the whole benchmark suite in one machine-readable report.
+
+generates the synthetic workloads, runs pipeline_bench (per-stage timings)
+and server_bench (both servers under concurrent load), and writes one JSON
+file stamped with the commit and machine. --compare checks the new report
+against an older one and exits 1 if any timing got slower than --threshold,
+so a regression shows up between commits. the LLM is the stub with no
+added latency unless LLM_BACKEND / LLM_STUB_LATENCY say otherwise.
+
+    python benchmarks/run_suite.py --out bench/$(git rev-parse --short HEAD).json
+    python benchmarks/run_suite.py --out new.json --compare bench/base.json
+    python benchmarks/run_suite.py --skip-servers --no-video --out quick.json
+'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import pipeline_bench
+import server_bench
+from workloads import generate, parse_resolution
+
+# numbers compared between reports: lower is better for all of them
+TIMING_KEYS = ("p50_ms", "concurrent_wall_seconds", "baseline_seconds", "latency_p50")
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=30)
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if out.returncode != 0:
+        return None
+    return out.stdout.strip() + ("-dirty" if dirty.stdout.strip() else "")
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "llm_backend": os.environ.get("LLM_BACKEND"),
+    }
+
+def timings(report, prefix=""):
+    # flatten to {"pipeline.audio.2s.vad.p50_ms": 0.31, ...} for TIMING_KEYS only
+    flat = {}
+    if isinstance(report, dict):
+        for key, value in report.items():
+            path = f"{prefix}.{key}" if prefix else str(key)
+            if key in TIMING_KEYS and isinstance(value, (int, float)):
+                flat[path] = value
+            else:
+                flat.update(timings(value, path))
+    return flat
+
+def compare(new, old, threshold):
+    '''timings present in both reports that got slower by more than threshold (0.2 = 20%)'''
+    new_timings, old_timings = timings(new), timings(old)
+    regressions = {}
+    for path in sorted(new_timings.keys() & old_timings.keys()):
+        before, after = old_timings[path], new_timings[path]
+        if before > 0 and after > before * (1 + threshold):
+            regressions[path] = {"before": before, "after": after, "ratio": round(after / before, 3)}
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, help="write the report here (default: stdout)")
+    parser.add_argument("--compare", type=Path, help="an earlier report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    parser.add_argument("--durations", type=float, nargs="+", default=[2, 5])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(320, 240), (640, 480)])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--servers", nargs="*", default=list(server_bench.SERVERS), choices=list(server_bench.SERVERS))
+    parser.add_argument("--skip-servers", action="store_true")
+    parser.add_argument("--no-video", action="store_true", help="no webm workloads (no PyAV needed)")
+    parser.add_argument("--no-transcribe", action="store_true", help="skip loading the transcription model")
+    args = parser.parse_args()
+
+    report = {"environment": environment(), "config": {
+        "durations": args.durations,
+        "resolutions": [f"{w}x{h}" for w, h in args.resolutions],
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+    }}
+    with tempfile.TemporaryDirectory(prefix="rizz-bench-") as workdir:
+        manifest = generate(workdir, args.durations, args.resolutions, video=not args.no_video)
+        print("running pipeline benchmarks...", file=sys.stderr)
+        report["pipeline"] = pipeline_bench.run(manifest, args.repeat, transcribe=not args.no_transcribe)
+        if not args.skip_servers:
+            print("running server benchmarks...", file=sys.stderr)
+            kinds = ("landmarks",) if args.no_video else ("landmarks", "video")
+            report["servers"] = server_bench.run(manifest, args.servers, kinds=kinds,
+                                                 levels=args.concurrency, seconds=args.durations[0])
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.threshold)
+        report["regressions"] = {"baseline": str(args.compare), "threshold": args.threshold,
+                                 "slower": regressions}
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(text + "\n")
+        print(f"report written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare and report["regressions"]["slower"]:
+        for path, change in report["regressions"]["slower"].items():
+            print(f"slower: {path} {change['before']} -> {change['after']} ({change['ratio']}x)", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+'''
+drive /process on both servers (api.py and web/web/server.py) under
+concurrent load with synthetic uploads.
+
+each server is started as a subprocess on a free port the way it is
+deployed -- Flask under gunicorn with the Procfile's worker/thread/timeout
+settings, FastAPI under uvicorn -- with the stub LLM and the result caches
+off (every request does the full work), waited on until /health answers,
+loaded by load_test.run_files at each concurrency level for each upload
+kind, then stopped. a server whose runner isn't installed is reported as
+skipped, with the reason. --url NAME=URL benchmarks an already running
+server instead of starting one.
+
+    python benchmarks/server_bench.py
+    python benchmarks/server_bench.py --servers flask --kinds landmarks -n 1 4 8
+    python benchmarks/server_bench.py --url fastapi=http://localhost:8000
+'''
+import argparse
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from load_test import run_files
+from workloads import generate
+
+# "{port}" is filled in at start; "runner" is the module the command needs.
+# flask matches the Procfile; keep the two in step
+SERVERS = {
+    "fastapi": {
+        "cmd": [sys.executable, "-m", "uvicorn", "--host", "127.0.0.1", "--port", "{port}", "api:app"],
+        "cwd": ROOT,
+        "runner": "uvicorn",
+        # the deploy runs flask, so requirements.txt leaves these out
+        "install": "pip install fastapi uvicorn",
+    },
+    "flask": {
+        "cmd": [sys.executable, "-m", "gunicorn", "--bind", "127.0.0.1:{port}", "--timeout", "300",
+                "--workers", "1", "--threads", "2", "server:app"],
+        "cwd": ROOT / "web" / "web",
+        "runner": "gunicorn",
+        "install": "pip install -r requirements.txt",
+    },
+}
+
+# defaults for the servers (the environment overrides them): the stub LLM,
+# and caches that keep nothing, since identical uploads would otherwise be
+# answered from cache after the first
+SERVER_ENV = {
+    "LLM_BACKEND": "stub",
+    "RESULT_CACHE_ENTRIES": "0",
+    "LLM_CACHE_ENTRIES": "0",
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as resp:
+                return json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            # /ready answers 503 until warm-up is done
+            body = json.loads(e.read() or b"null")
+            if e.code != 503:
+                return body
+        except (OSError, ValueError):
+            pass
+        time.sleep(0.25)
+    return None
+
+def missing_runner(name):
+    # why `name` can't be started here, or None if it can
+    runner = SERVERS[name]["runner"]
+    if importlib.util.find_spec(runner) is None:
+        return f"{runner} is not installed ({SERVERS[name]['install']})"
+    return None
+
+def start_server(name, log_dir, startup_timeout):
+    '''(process, url, startup seconds); process is None if it never came up'''
+    port = free_port()
+    env = {**SERVER_ENV, **os.environ, "PORT": str(port)}
+    env.pop("RESULT_CACHE_DIR", None)
+    t0 = time.perf_counter()
+    with open(Path(log_dir) / f"{name}.log", "wb") as log:
+        cmd = [arg.format(port=port) for arg in SERVERS[name]["cmd"]]
+        proc = subprocess.Popen(cmd, cwd=SERVERS[name]["cwd"], env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    up = None
+    while proc.poll() is None and up is None and time.perf_counter() - t0 < startup_timeout:
+        up = wait_for(url + "/health", 1)
+    startup = time.perf_counter() - t0
+    if up is None:
+        stop_server(proc)
+        return None, url, startup
+    return proc, url, startup
+
+def stop_server(proc):
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def upload_sets(manifest, kinds, seconds):
+    # kind -> multipart files for one request
+    label = f"{seconds:g}s"
+    sets = {}
+    if "landmarks" in kinds:
+        sets["landmarks"] = {"landmarks": manifest["landmarks"][label], "audio": manifest["wav"][label]}
+    if "video" in kinds:
+        # the browser's upload: a webm with its own audio track
+        name = next(name for name in manifest["webm"] if name.endswith("@" + label))
+        sets["video"] = {"video": manifest["webm"][name]}
+    return sets
+
+def bench_server(url, uploads, levels, timeout, ready_timeout):
+    result = {"ready": wait_for(url + "/ready", ready_timeout), "load": {}}
+    for kind, files in uploads.items():
+        result["load"][kind] = {}
+        for n in levels:
+            try:
+                result["load"][kind][n] = run_files(url, files, n, timeout)
+            except Exception as e:
+                result["load"][kind][n] = {"error": f"{type(e).__name__}: {e}"}
+    return result
+
+def run(manifest, servers=tuple(SERVERS), urls=None, kinds=("landmarks", "video"), levels=(1, 4),
+        seconds=2, timeout=300, startup_timeout=120, ready_timeout=30, log_dir=None):
+    '''load results per server; urls maps a server name to an already running one'''
+    urls = urls or {}
+    uploads = upload_sets(manifest, kinds, seconds)
+    log_dir = log_dir or tempfile.mkdtemp(prefix="rizz-servers-")
+    results = {}
+    for name in list(servers) + [name for name in urls if name not in servers]:
+        if name in urls:
+            results[name] = bench_server(urls[name].rstrip("/"), uploads, levels, timeout, ready_timeout)
+            continue
+        skipped = missing_runner(name)
+        if skipped:
+            print(f"skipping {name}: {skipped}", file=sys.stderr)
+            results[name] = {"skipped": skipped}
+            continue
+        proc, url, startup = start_server(name, log_dir, startup_timeout)
+        if proc is None:
+            results[name] = {"error": "server did not start", "log": str(Path(log_dir) / f"{name}.log")}
+            continue
+        try:
+            results[name] = {"startup_seconds": round(startup, 3),
+                             **bench_server(url, uploads, levels, timeout, ready_timeout)}
+        finally:
+            stop_server(proc)
+    return results
+
+def parse_url(text):
+    name, url = text.split("=", 1)
+    return name, url
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="*", default=list(SERVERS), choices=list(SERVERS))
+    parser.add_argument("--url", type=parse_url, action="append", default=[], help="NAME=URL of a running server")
+    parser.add_argument("--kinds", nargs="+", default=["landmarks", "video"], choices=["landmarks", "video"])
+    parser.add_argument("-n", "--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--seconds", type=float, default=2, help="duration of the synthetic uploads")
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    urls = dict(args.url)
+    servers = [name for name in args.servers if name not in urls]
+    with tempfile.TemporaryDirectory(prefix="rizz-bench-") as workdir:
+        manifest = generate(workdir, [args.seconds], [(640, 480)], video="video" in args.kinds)
+        results = run(manifest, servers, urls, args.kinds, args.concurrency, args.seconds, args.timeout)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
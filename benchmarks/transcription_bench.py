@@ -0,0 +1,97 @@
+'''
+compare transcription backends on real-time factor and accuracy.
+
+RTF is transcription time / audio duration (lower is faster, < 1 is faster
+than real time). accuracy is word error rate against --reference-text when
+given, otherwise against the first backend's output, i.e. how far each
+engine drifts from plain PyTorch Whisper.
+
+    python benchmarks/transcription_bench.py
+    python benchmarks/transcription_bench.py --backends whisper faster-whisper --model tiny.en clip.wav
+'''
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import soundfile as sf
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from transcription import BACKENDS, WHISPER_MODEL, load_backend
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", " ", text.lower()).split()
+
+def word_error_rate(reference, hypothesis):
+    ref, hyp = normalize(reference), normalize(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    # levenshtein over words, one row at a time
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1] / len(ref)
+
+def bench_backend(name, model, clips, runs):
+    t0 = time.perf_counter()
+    try:
+        backend = load_backend(name, model)
+    except ImportError as e:
+        return {"backend": name, "skipped": str(e)}
+    load_seconds = time.perf_counter() - t0
+
+    results = []
+    for clip in clips:
+        duration = sf.info(str(clip)).duration
+        text = backend.transcribe(str(clip))  # warm-up run, also the output we score
+        times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            backend.transcribe(str(clip))
+            times.append(time.perf_counter() - t0)
+        best = min(times)
+        results.append({
+            "clip": clip.name,
+            "duration_seconds": round(duration, 3),
+            "best_seconds": round(best, 4),
+            "rtf": round(best / duration, 4) if duration else None,
+            "text": text,
+        })
+    return {"backend": name, "model": model, "load_seconds": round(load_seconds, 3), "clips": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("clips", nargs="*", type=Path, default=[ROOT / "temp_audio.wav"])
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument("--model", default=WHISPER_MODEL)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--reference-text", type=Path, help="ground truth transcript for a single clip")
+    parser.add_argument("--output", type=Path, help="write the JSON report here as well")
+    args = parser.parse_args()
+
+    reports = [bench_backend(name, args.model, args.clips, args.runs) for name in args.backends]
+
+    # score every backend's text against the ground truth, or the first backend that ran
+    scored = [r for r in reports if "clips" in r]
+    if scored:
+        if args.reference_text:
+            references = [args.reference_text.read_text()] * len(args.clips)
+        else:
+            references = [c["text"] for c in scored[0]["clips"]]
+        for report in scored:
+            for clip, reference in zip(report["clips"], references):
+                clip["wer"] = round(word_error_rate(reference, clip["text"]), 4)
+
+    output = json.dumps({"reference": "text" if args.reference_text else "first-backend", "results": reports}, indent=2)
+    print(output)
+    if args.output:
+        args.output.write_text(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+'''
+synthetic inputs for the benchmarks: speech-like wav, webm clips (a drawn
+face plus an opus audio track) at any duration/resolution, and
+landmark_codec fixtures that need no camera or face mesh.
+
+everything is seeded, so the same arguments give the same bytes and
+results stay comparable between commits.
+
+    python benchmarks/workloads.py --out /tmp/workloads
+    python benchmarks/workloads.py --out /tmp/workloads --durations 2 10 --resolutions 320x240 1280x720
+'''
+import argparse
+import fractions
+import json
+import sys
+import wave
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+from landmark_codec import N_LANDMARKS, encode_landmarks
+
+SAMPLE_RATE = 16000
+VIDEO_FPS = 30
+
+# normalized (x, y) of the landmarks au_feature.py and metrics.py read; the
+# rest of the mesh is scattered inside the face oval
+FACE_POINTS = {
+    10: (0.50, 0.25), 152: (0.50, 0.75), 1: (0.50, 0.52), 168: (0.50, 0.40),
+    9: (0.50, 0.35), 107: (0.45, 0.36),
+    33: (0.38, 0.42), 133: (0.45, 0.42), 159: (0.415, 0.41), 145: (0.415, 0.43),
+    263: (0.62, 0.42), 362: (0.55, 0.42), 386: (0.585, 0.41), 374: (0.585, 0.43),
+    70: (0.44, 0.37), 105: (0.40, 0.36), 300: (0.56, 0.37), 334: (0.60, 0.36),
+    61: (0.45, 0.62), 291: (0.55, 0.62), 13: (0.50, 0.61), 14: (0.50, 0.625),
+}
+EYE_TOPS = (159, 386)
+MOUTH_CORNERS = (61, 291)
+CENTER = np.array([0.5, 0.5])
+
+def face_template(seed=0):
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(0, 2 * np.pi, N_LANDMARKS)
+    radius = np.sqrt(rng.uniform(0, 1, N_LANDMARKS))
+    points = np.zeros((N_LANDMARKS, 3), dtype=np.float64)
+    points[:, 0] = 0.5 + 0.17 * radius * np.cos(angle)
+    points[:, 1] = 0.5 + 0.25 * radius * np.sin(angle)
+    points[:, 2] = rng.normal(0, 0.02, N_LANDMARKS)
+    for idx, xy in FACE_POINTS.items():
+        points[idx, :2] = xy
+    return points
+
+def synthetic_landmarks(n_frames, fps=VIDEO_FPS, seed=0):
+    '''
+    (n_frames, 478, 3) float32 of a face that smiles on a 3 s cycle, blinks
+    every 2.5 s, sways its head a few degrees and jitters like a real tracker
+    '''
+    rng = np.random.default_rng(seed)
+    template = face_template(seed)
+    frames = np.repeat(template[None], n_frames, axis=0)
+    t = np.arange(n_frames) / fps
+
+    smile = 0.5 + 0.5 * np.sin(2 * np.pi * t / 3)
+    frames[:, MOUTH_CORNERS[0], 0] -= 0.015 * smile
+    frames[:, MOUTH_CORNERS[1], 0] += 0.015 * smile
+    frames[:, MOUTH_CORNERS, 1] -= (0.01 * smile)[:, None]
+    frames[:, 14, 1] += 0.02 * np.clip(np.sin(2 * np.pi * t / 1.7), 0, None)
+
+    blink = (t % 2.5) < 0.1
+    frames[np.ix_(blink, EYE_TOPS, [1])] += 0.018
+
+    tilt = np.radians(3 * np.sin(2 * np.pi * t / 5))
+    cos, sin = np.cos(tilt)[:, None], np.sin(tilt)[:, None]
+    xy = frames[..., :2] - CENTER
+    frames[..., 0] = CENTER[0] + cos * xy[..., 0] - sin * xy[..., 1]
+    frames[..., 1] = CENTER[1] + sin * xy[..., 0] + cos * xy[..., 1]
+
+    frames[..., :2] += rng.normal(0, 0.001, frames[..., :2].shape)
+    return frames.astype(np.float32)
+
+def landmark_payload(n_frames, width=640, height=480, fps=VIDEO_FPS, seed=0):
+    # a /process `landmarks` upload: one landmark_codec record per frame
+    points = synthetic_landmarks(n_frames, fps, seed)
+    return b"".join(encode_landmarks(p, width, height, i / fps) for i, p in enumerate(points))
+
+def synthetic_speech(seconds, sr=SAMPLE_RATE, seed=0):
+    '''
+    float32 mono: 0.6 s "words" of a gliding 110-220 Hz harmonic tone with
+    three syllable beats, short gaps, a half-second pause every 2 s, over a
+    faint noise floor -- enough for VAD, pitch tracking and whisper's timing
+    (not its accuracy)
+    '''
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    audio = rng.normal(0, 0.003, n)
+    word, gap = int(0.6 * sr), int(0.15 * sr)
+    start = 0
+    while start < n:
+        if (start / sr) % 2.0 > 1.5:
+            start += int(0.5 * sr)
+            continue
+        end = min(start + word, n)
+        seg = np.arange(end - start) / sr
+        f0 = rng.uniform(110, 220) * (1 + 0.2 * np.sin(2 * np.pi * seg / 0.6))
+        phase = 2 * np.pi * np.cumsum(f0) / sr
+        tone = sum(np.sin(k * phase) / k for k in range(1, 6))
+        beats = 0.6 + 0.4 * np.abs(np.sin(np.pi * seg / 0.2))
+        audio[start:end] += 0.15 * tone * beats * np.sqrt(np.hanning(end - start))
+        start = end + gap
+    return audio.astype(np.float32)
+
+def write_wav(path, audio, sr=SAMPLE_RATE):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sr)
+        wf.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+    return path
+
+def draw_face(points, width, height):
+    import cv2
+    frame = np.full((height, width, 3), 40, dtype=np.uint8)
+    px = lambda idx: (int(points[idx, 0] * width), int(points[idx, 1] * height))
+    center = px(168)
+    axes = (int(0.17 * width), int(0.26 * height))
+    cv2.ellipse(frame, (center[0], int(0.5 * height)), axes, 0, 0, 360, (150, 180, 225), -1)
+    for outer, inner, top, bottom in ((33, 133, 159, 145), (263, 362, 386, 374)):
+        cv2.ellipse(frame, ((px(outer)[0] + px(inner)[0]) // 2, (px(top)[1] + px(bottom)[1]) // 2),
+                    (abs(px(inner)[0] - px(outer)[0]) // 2, max(1, abs(px(bottom)[1] - px(top)[1]) // 2)),
+                    0, 0, 360, (255, 255, 255), -1)
+    cv2.line(frame, px(105), px(70), (60, 50, 40), max(1, width // 160))
+    cv2.line(frame, px(300), px(334), (60, 50, 40), max(1, width // 160))
+    mouth = np.array([px(61), px(13), px(291), px(14)], dtype=np.int32)
+    cv2.fillPoly(frame, [mouth], (70, 60, 170))
+    return frame
+
+def write_webm(path, seconds, width=640, height=480, fps=VIDEO_FPS, audio=True, seed=0):
+    '''
+    a vp8/opus webm like the browser's MediaRecorder output: the drawn
+    synthetic face, plus synthetic speech as the audio track
+    '''
+    import av
+    n_frames = max(1, int(seconds * fps))
+    points = synthetic_landmarks(n_frames, fps, seed)
+    with av.open(str(path), "w", format="webm") as container:
+        video = container.add_stream("libvpx", rate=fps)
+        video.width, video.height, video.pix_fmt = width, height, "yuv420p"
+        audio_stream = container.add_stream("libopus", rate=48000, layout="mono") if audio else None
+        for frame_points in points:
+            frame = av.VideoFrame.from_ndarray(draw_face(frame_points, width, height), format="bgr24")
+            for packet in video.encode(frame):
+                container.mux(packet)
+        for packet in video.encode():
+            container.mux(packet)
+        if audio_stream is not None:
+            speech = synthetic_speech(seconds, 48000, seed)
+            for start in range(0, len(speech), 960):
+                frame = av.AudioFrame.from_ndarray(speech[None, start:start + 960], format="flt", layout="mono")
+                frame.sample_rate = 48000
+                frame.pts = start
+                frame.time_base = fractions.Fraction(1, 48000)
+                for packet in audio_stream.encode(frame):
+                    container.mux(packet)
+            for packet in audio_stream.encode():
+                container.mux(packet)
+    return path
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+def generate(out_dir, durations=(2, 5), resolutions=((320, 240), (640, 480)), video=True):
+    '''
+    writes a workload set to out_dir and returns its manifest:
+    {"wav": {"Ns": path}, "landmarks": {"Ns": path}, "webm": {"WxH@Ns": path}}
+    '''
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = {"wav": {}, "landmarks": {}, "webm": {}}
+    for seconds in durations:
+        label = f"{seconds:g}s"
+        manifest["wav"][label] = str(write_wav(out_dir / f"speech_{label}.wav", synthetic_speech(seconds)))
+        path = out_dir / f"landmarks_{label}.lmk"
+        # the browser samples at the server's 6 fps
+        path.write_bytes(landmark_payload(int(seconds * 6), fps=6))
+        manifest["landmarks"][label] = str(path)
+        if not video:
+            continue
+        for width, height in resolutions:
+            name = f"{width}x{height}@{label}"
+            manifest["webm"][name] = str(write_webm(out_dir / f"face_{width}x{height}_{label}.webm",
+                                                    seconds, width, height))
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--durations", type=float, nargs="+", default=[2, 5])
+    parser.add_argument("--resolutions", type=parse_resolution, nargs="+", default=[(320, 240), (640, 480)])
+    parser.add_argument("--no-video", action="store_true", help="skip the webm clips (no PyAV needed)")
+    args = parser.parse_args()
+    manifest = generate(args.out, args.durations, args.resolutions, video=not args.no_video)
+    print(json.dumps(manifest, indent=2))
+
+if __name__ == "__main__":
+    main()
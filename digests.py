@@ -0,0 +1,11 @@
+import hashlib
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def array_digest(array):
+    return hashlib.sha256(array.tobytes()).hexdigest()
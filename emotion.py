@@ -0,0 +1,100 @@
+import os
+
+import cv2
+import numpy as np
+
+EMOTIONS = ["neutral", "happiness", "surprise", "sadness", "anger", "disgust", "fear", "contempt"]
+INPUT_SIZE = 260
+EMOTION_BATCH_SIZE = int(os.environ.get("EMOTION_BATCH_SIZE", 8))
+# extra room around the landmark bounding box, as a fraction of its size
+CROP_MARGIN = 0.15
+
+def crop_face(rgb, points, margin=CROP_MARGIN, size=INPUT_SIZE):
+    '''
+    crop the face out of an RGB frame using its normalized landmarks and
+    resize it to the model's input size. returns a (size, size, 3) uint8
+    array, or None if the box falls outside the frame.
+    '''
+    h, w = rgb.shape[:2]
+    xs = points[:, 0] * w
+    ys = points[:, 1] * h
+    x0, x1 = xs.min(), xs.max()
+    y0, y1 = ys.min(), ys.max()
+    pad_x = (x1 - x0) * margin
+    pad_y = (y1 - y0) * margin
+    x0 = max(0, int(x0 - pad_x))
+    y0 = max(0, int(y0 - pad_y))
+    x1 = min(w, int(x1 + pad_x))
+    y1 = min(h, int(y1 + pad_y))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return cv2.resize(rgb[y0:y1, x0:x1], (size, size))
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+class EmotionBatcher:
+    '''
+    collects face crops into a preallocated (N, 3, 260, 260) float32 buffer
+    and runs one session.run per N crops instead of one per frame.
+    '''
+
+    def __init__(self, session, batch_size=EMOTION_BATCH_SIZE):
+        model_input = session.get_inputs()[0]
+        self.session = session
+        self.input_name = model_input.name
+        self.output_name = session.get_outputs()[0].name
+        # models exported with a fixed batch dim can only take that many
+        fixed = model_input.shape[0] if model_input.shape else None
+        if isinstance(fixed, int) and fixed > 0:
+            batch_size = fixed
+        self.batch_size = max(1, batch_size)
+        self.buffer = np.empty((self.batch_size, 3, INPUT_SIZE, INPUT_SIZE), dtype=np.float32)
+        self.pending = 0
+        self.outputs = []
+        self.runs = 0
+
+    def add(self, crop):
+        # crop: (260, 260, 3) uint8 RGB, same preprocessing as main.get_emotion
+        slot = self.buffer[self.pending]
+        slot[...] = crop.transpose(2, 0, 1)
+        slot *= 1.0 / 255.0
+        self.pending += 1
+        if self.pending == self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch = self.buffer if self.pending == self.batch_size else self.buffer[:self.pending]
+        pred = self.session.run([self.output_name], {self.input_name: batch})[0]
+        self.outputs.append(np.asarray(pred, dtype=np.float32).reshape(self.pending, -1))
+        self.pending = 0
+        self.runs += 1
+
+    def probabilities(self):
+        '''(n_frames, n_emotions) per-frame probabilities'''
+        self.flush()
+        if not self.outputs:
+            return np.empty((0, len(EMOTIONS)), dtype=np.float32)
+        pred = np.concatenate(self.outputs)
+        # the model emits raw scores; normalize unless it already did
+        if pred.min() < 0 or not np.allclose(pred.sum(axis=1), 1.0, atol=1e-3):
+            pred = _softmax(pred)
+        return pred
+
+    def summary(self):
+        probs = self.probabilities()
+        if not len(probs):
+            return None
+        mean = probs.mean(axis=0)
+        per_frame = probs.argmax(axis=1)
+        return {
+            "dominant": EMOTIONS[int(mean.argmax())],
+            "probabilities": {name: float(p) for name, p in zip(EMOTIONS, mean)},
+            "frame_counts": {
+                name: int(c) for name, c in zip(EMOTIONS, np.bincount(per_frame, minlength=len(EMOTIONS))) if c
+            },
+            "frames": int(len(probs)),
+        }
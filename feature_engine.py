@@ -0,0 +1,39 @@
+import numpy as np
+
+from au_feature import AU_NAMES, compute_aus_batch
+from landmark_codec import decode_landmarks, mirror_landmarks
+from metrics import METRIC_NAMES, compute_metrics_batch
+
+FEATURE_NAMES = AU_NAMES + METRIC_NAMES
+N_AUS = len(AU_NAMES)
+
+def compute_features_batch(points, w, h):
+    '''
+    points: (n_frames, 478, 3) float32 landmark tensor
+    returns (n_frames, len(FEATURE_NAMES)) array, AUs first then metrics
+    '''
+    points = np.asarray(points)
+    if points.ndim == 2:
+        points = points[None]
+    return np.concatenate(
+        [compute_aus_batch(points, w, h), compute_metrics_batch(points, w, h)],
+        axis=1,
+    )
+
+def split_features(row):
+    # one feature row (e.g. a column mean) -> (aus dict, metrics dict)
+    aus = {name: float(v) for name, v in zip(AU_NAMES, row[:N_AUS])}
+    metrics = {name: float(v) for name, v in zip(METRIC_NAMES, row[N_AUS:])}
+    return aus, metrics
+
+def average_features(points, w, h):
+    if len(points) == 0:
+        return None, None
+    return split_features(compute_features_batch(points, w, h).mean(axis=0))
+
+def average_landmark_payload(payload):
+    # landmark_codec records (e.g. from the browser's face mesh) -> (aus, metrics).
+    # clients send the camera's own orientation; the server's face mesh runs
+    # on mirrored frames, so mirror the points the same way
+    points, widths, heights, _ = decode_landmarks(payload)
+    return average_features(mirror_landmarks(points), widths, heights)
@@ -0,0 +1,95 @@
+import math
+import os
+
+import cv2
+
+# what the old "every 5th frame of ~30fps" loop worked out to
+DEFAULT_TARGET_FPS = float(os.environ.get("SAMPLE_TARGET_FPS", 6))
+DEFAULT_MAX_FRAMES = int(os.environ.get("SAMPLE_MAX_FRAMES", 120))
+
+# browser webm often reports 0 or 1000 fps and no frame count
+FALLBACK_FPS = 30.0
+MAX_SANE_FPS = 240.0
+
+class FrameSampler:
+    '''
+    yields (index, timestamp_ms, bgr_frame) for the sampled frames only.
+
+    skipped frames are grab()-ed but never retrieve()-d, so they are never
+    converted to BGR ndarrays. sampling is by timestamp, so it follows the
+    upload's real (possibly variable) frame rate. with mode="seek" it jumps
+    straight to each sample time instead of grabbing through the gap, which
+    wins when samples are far apart on a seekable container.
+    '''
+
+    def __init__(self, cap, target_fps=DEFAULT_TARGET_FPS, max_frames=DEFAULT_MAX_FRAMES, mode="grab"):
+        self.cap = cap
+        self.mode = mode
+        self.max_frames = max_frames
+        self.frames_grabbed = 0
+        self.frames_retrieved = 0
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.fps = fps if 0 < fps <= MAX_SANE_FPS else FALLBACK_FPS
+
+        count = cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0.0
+        self.duration_ms = count / self.fps * 1000.0 if count > 0 else None
+
+        # don't ask for more than one sample per source frame
+        interval_ms = 1000.0 / min(target_fps, self.fps)
+        if self.duration_ms and max_frames:
+            # spread the budget over the whole clip instead of using it up early
+            interval_ms = max(interval_ms, self.duration_ms / max_frames)
+        self.interval_ms = interval_ms
+        # container timestamps are rounded (webm to whole milliseconds), so a
+        # frame within half a source frame of its slot still counts as on time
+        self.tolerance_ms = 0.5 * 1000.0 / self.fps
+
+    def _timestamp(self, fallback_ms):
+        # some backends report 0 for every frame
+        ts = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        return ts if ts and ts > 0 else fallback_ms
+
+    def seek(self, timestamp_ms):
+        return self.cap.set(cv2.CAP_PROP_POS_MSEC, timestamp_ms)
+
+    def _grab_frames(self):
+        next_ms = 0.0
+        while not self.max_frames or self.frames_retrieved < self.max_frames:
+            if not self.cap.grab():
+                return
+            self.frames_grabbed += 1
+            ts = self._timestamp((self.frames_grabbed - 1) * 1000.0 / self.fps)
+            if ts + self.tolerance_ms < next_ms:
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                return
+            self.frames_retrieved += 1
+            yield self.frames_grabbed - 1, ts, frame
+            # schedule from the ideal grid so rounding doesn't drift the rate
+            next_ms += self.interval_ms * max(1, math.floor((ts - next_ms) / self.interval_ms) + 1)
+
+    def _seek_frames(self):
+        next_ms = 0.0
+        while not self.max_frames or self.frames_retrieved < self.max_frames:
+            if self.duration_ms is not None and next_ms >= self.duration_ms:
+                return
+            if next_ms > 0 and not self.seek(next_ms - self.tolerance_ms):
+                return
+            if not self.cap.grab():
+                return
+            self.frames_grabbed += 1
+            ts = self._timestamp(next_ms)
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                return
+            self.frames_retrieved += 1
+            yield round(ts * self.fps / 1000.0), ts, frame
+            # the next seek lands half a frame early, so step at least a frame past ts
+            next_ms = max(next_ms + self.interval_ms, ts + 1000.0 / self.fps)
+
+    def __iter__(self):
+        if self.mode == "seek":
+            return self._seek_frames()
+        return self._grab_frames()
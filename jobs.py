@@ -0,0 +1,159 @@
+import importlib
+import os
+import queue
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.environ.get("JOB_QUEUE_SIZE", 16))
+# finished jobs are kept this long for clients to collect
+JOB_TTL = float(os.environ.get("JOB_TTL", 600))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+class QueueFull(Exception):
+    pass
+
+class JobFailed(Exception):
+    '''raised by a job to fail with a client-facing message and optional payload'''
+
+    def __init__(self, message, payload=None):
+        super().__init__(message)
+        self.payload = payload
+
+class Job:
+    def __init__(self, fn, args):
+        self.id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        data = {"id": self.id, "status": self.status, "created": self.created}
+        if self.started:
+            data["queued_seconds"] = round(self.started - self.created, 3)
+        if self.finished:
+            data["run_seconds"] = round(self.finished - self.started, 3)
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+class JobBackend(ABC):
+    '''
+    what the servers need from a job queue. the in-process queue below is the
+    default; an external broker (redis, sqs, ...) plugs in by implementing
+    these and pointing JOB_BACKEND at it as "module:Class". a backend missing
+    one of them fails when it is constructed, not on its first request.
+    '''
+
+    @abstractmethod
+    def submit(self, fn, *args):
+        '''enqueue fn(*args), return the job id. raise QueueFull to shed load.'''
+
+    @abstractmethod
+    def status(self, job_id):
+        '''job as a dict (see Job.to_dict), or None if unknown/expired'''
+
+    @abstractmethod
+    def wait(self, job_id, timeout):
+        '''block until the job changes state or timeout; return status(job_id)'''
+
+    def stats(self):
+        return {}
+
+class InProcessJobQueue(JobBackend):
+    '''bounded queue drained by a fixed set of worker threads'''
+
+    def __init__(self, workers=JOB_WORKERS, max_queued=JOB_QUEUE_SIZE, ttl=JOB_TTL):
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._ttl = ttl
+        self._workers = []
+        for i in range(workers):
+            t = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def _purge(self):
+        cutoff = time.time() - self._ttl
+        expired = [jid for jid, job in self._jobs.items() if job.finished and job.finished < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def submit(self, fn, *args):
+        job = Job(fn, args)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise QueueFull(f"{self._queue.maxsize} jobs already waiting")
+        return job.id
+
+    def _set(self, job, **fields):
+        with self._changed:
+            for k, v in fields.items():
+                setattr(job, k, v)
+            self._changed.notify_all()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            self._set(job, status=RUNNING, started=time.time())
+            try:
+                result = job.fn(*job.args)
+                self._set(job, status=DONE, result=result, finished=time.time())
+            except JobFailed as e:
+                self._set(job, status=FAILED, error=str(e), result=e.payload, finished=time.time())
+            except Exception as e:
+                print(f"job {job.id} failed: {e}")
+                self._set(job, status=FAILED, error=str(e), finished=time.time())
+            finally:
+                job.fn, job.args = None, None
+                self._queue.task_done()
+
+    def status(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def wait(self, job_id, timeout):
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            before = job.status
+            if before in (QUEUED, RUNNING):
+                self._changed.wait_for(lambda: job.status != before, timeout=timeout)
+            return job.to_dict()
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"workers": len(self._workers), "max_queued": self._queue.maxsize, "jobs": counts}
+
+def make_job_backend():
+    spec = os.environ.get("JOB_BACKEND", "inprocess")
+    if spec == "inprocess":
+        return InProcessJobQueue()
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
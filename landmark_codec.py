@@ -0,0 +1,73 @@
+import struct
+
+import numpy as np
+
+# refine_landmarks=True face mesh: 468 points + 10 iris points
+N_LANDMARKS = 478
+
+# one record per frame: little-endian (timestamp seconds, frame width, frame
+# height) followed by the normalized x, y, z of every landmark as float16.
+# float16 keeps ~3 significant digits, well under a pixel at webcam sizes
+HEADER = struct.Struct("<fHH")
+POINTS_BYTES = N_LANDMARKS * 3 * 2
+RECORD_BYTES = HEADER.size + POINTS_BYTES
+
+_RECORD_DTYPE = np.dtype([
+    ("t", "<f4"),
+    ("w", "<u2"),
+    ("h", "<u2"),
+    ("points", "<f2", (N_LANDMARKS, 3)),
+])
+assert _RECORD_DTYPE.itemsize == RECORD_BYTES
+
+# left/right landmark pairs of the face mesh, for every off-midline index
+# au_feature.py and metrics.py read (the rest they read -- 1, 9, 10, 13,
+# 14, 152, 168 -- sit on the midline). extend it before reading a new one
+MIRROR_PAIRS = (
+    (33, 263), (133, 362), (159, 386), (145, 374),
+    (70, 300), (105, 334), (107, 336), (61, 291),
+    (468, 473),  # iris centers
+)
+_MIRROR_ORDER = np.arange(N_LANDMARKS)
+for _a, _b in MIRROR_PAIRS:
+    _MIRROR_ORDER[_a], _MIRROR_ORDER[_b] = _b, _a
+
+class LandmarkPayloadError(ValueError):
+    pass
+
+def encode_landmarks(points, w, h, t=0.0):
+    '''one frame's (478, 3) normalized landmarks -> RECORD_BYTES bytes'''
+    points = np.asarray(points, dtype="<f2").reshape(N_LANDMARKS, 3)
+    return HEADER.pack(t, w, h) + points.tobytes()
+
+def decode_landmarks(payload):
+    '''
+    concatenated records -> (points, widths, heights, timestamps): points is
+    (n_frames, 478, 3) float32, the rest are (n_frames,) arrays. no copy of
+    the payload is made until the float16 -> float32 widen.
+    '''
+    if len(payload) % RECORD_BYTES:
+        raise LandmarkPayloadError(
+            f"landmark payload is {len(payload)} bytes, not a multiple of {RECORD_BYTES}"
+        )
+    records = np.frombuffer(payload, dtype=_RECORD_DTYPE)
+    points = records["points"].astype(np.float32)
+    if not np.isfinite(points).all():
+        raise LandmarkPayloadError("landmark payload contains non-finite values")
+    return (
+        points,
+        records["w"].astype(np.float64),
+        records["h"].astype(np.float64),
+        records["t"].astype(np.float64),
+    )
+
+def mirror_landmarks(points):
+    '''
+    (..., 478, 3) landmarks of a frame -> the landmarks a face mesh finds in
+    the horizontally flipped frame: x becomes 1 - x, and each left/right
+    pair swaps indices, since the mesh labels the flipped face's image-left
+    eye 33 just as it does the original's
+    '''
+    mirrored = np.asarray(points)[..., _MIRROR_ORDER, :].copy()
+    mirrored[..., 0] = 1 - mirrored[..., 0]
+    return mirrored
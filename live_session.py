@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from au_feature import landmarks_to_array
+from audio_demux import WHISPER_SAMPLE_RATE
+from feature_engine import FEATURE_NAMES, compute_features_batch, split_features
+from landmark_codec import decode_landmarks, mirror_landmarks
+from model_pool import PoolTimeout
+from session_stats import SessionAggregator
+
+# binary websocket messages start with one of these tags
+FRAME = ord("F")      # JPEG-encoded webcam frame
+LANDMARKS = ord("L")  # landmark_codec records, computed in the browser
+AUDIO = ord("A")      # float32 mono PCM at WHISPER_SAMPLE_RATE
+
+# frames waiting for analysis per connection; past this the oldest is
+# dropped, so a slow server shows recent frames instead of building a backlog
+LIVE_FRAME_QUEUE = int(os.environ.get("LIVE_FRAME_QUEUE", 2))
+LIVE_PUSH_INTERVAL = float(os.environ.get("LIVE_PUSH_INTERVAL", 0.25))
+LIVE_MAX_SECONDS = float(os.environ.get("LIVE_MAX_SECONDS", 30))
+LIVE_MAX_SESSIONS = int(os.environ.get("LIVE_MAX_SESSIONS", 4))
+# how long a session's first webcam frame waits for a free FaceMesh; if none
+# frees up the frame is dropped and the next one tries again
+LIVE_MESH_WAIT = float(os.environ.get("LIVE_MESH_WAIT", 0.5))
+# a little over LIVE_MAX_SECONDS of audio; anything past it is dropped
+MAX_AUDIO_SAMPLES = int((LIVE_MAX_SECONDS + 5) * WHISPER_SAMPLE_RATE)
+
+class LiveSession:
+    '''
+    state for one streaming connection, independent of the transport.
+    the server's receive loop calls offer()/add_audio(); a worker drains the
+    frame queue through process() on the inference executor and sends
+    rolling() back every LIVE_PUSH_INTERVAL.
+
+    FaceMesh runs in tracking mode, so consecutive frames must come from one
+    face: the first webcam frame checks an instance out of the pool and the
+    session keeps it until close(). landmark-only sessions never take one.
+    '''
+
+    def __init__(self, face_mesh_pool, max_seconds=LIVE_MAX_SECONDS):
+        self.face_mesh_pool = face_mesh_pool
+        self._face_mesh = None
+        # close() can run while a frame is still on the executor
+        self._mesh_lock = threading.Lock()
+        self._closed = False
+        self.aggregator = SessionAggregator(FEATURE_NAMES)
+        self.started = time.monotonic()
+        self.max_seconds = max_seconds
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_processed = 0
+        self.latest = None
+        self._audio = []
+        self._audio_samples = 0
+
+    def expired(self):
+        return time.monotonic() - self.started > self.max_seconds
+
+    def offer(self, frame_q, message):
+        '''queue a frame/landmark message, dropping the oldest one if the worker is behind'''
+        self.frames_received += 1
+        if frame_q.full():
+            frame_q.get_nowait()
+            self.frames_dropped += 1
+        frame_q.put_nowait(message)
+
+    def add_audio(self, payload):
+        room = MAX_AUDIO_SAMPLES - self._audio_samples
+        if room <= 0:
+            return
+        chunk = np.frombuffer(payload, dtype="<f4", count=min(len(payload) // 4, room))
+        self._audio.append(chunk)
+        self._audio_samples += len(chunk)
+
+    def audio(self):
+        if not self._audio:
+            return None
+        return np.concatenate(self._audio).astype(np.float32, copy=False)
+
+    def _frame_features(self, jpeg):
+        frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        # same orientation as the upload pipeline
+        frame = cv2.flip(frame, 1)
+        h, w, _ = frame.shape
+        with self._mesh_lock:
+            if self._closed:
+                return None
+            if self._face_mesh is None:
+                try:
+                    self._face_mesh = self.face_mesh_pool.acquire(timeout=LIVE_MESH_WAIT)
+                except PoolTimeout:
+                    self.frames_dropped += 1
+                    return None
+            results = self._face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not results.multi_face_landmarks:
+            return None
+        points = landmarks_to_array(results.multi_face_landmarks[0].landmark)
+        return compute_features_batch(points, w, h)
+
+    def process(self, message):
+        '''analyze one queued message (blocking; run it off the event loop)'''
+        tag, payload = message[0], message[1:]
+        if tag == FRAME:
+            rows = self._frame_features(payload)
+        elif tag == LANDMARKS:
+            points, widths, heights, _ = decode_landmarks(payload)
+            # raw camera orientation, like /process uploads; match the mirrored frames
+            rows = compute_features_batch(mirror_landmarks(points), widths, heights) if len(points) else None
+        else:
+            return
+        self.frames_processed += 1
+        if rows is None:
+            return
+        self.aggregator.update_batch(rows, time.monotonic() - self.started)
+        self.latest = rows[-1]
+
+    def close(self):
+        '''
+        hand the session's FaceMesh back to the pool; safe to call twice.
+        waits for a frame still being analyzed, so nobody else gets the
+        instance mid-frame
+        '''
+        with self._mesh_lock:
+            self._closed = True
+            face_mesh, self._face_mesh = self._face_mesh, None
+        if face_mesh is not None:
+            self.face_mesh_pool.release(face_mesh)
+
+    def rolling(self):
+        '''the message pushed to the client while the session runs'''
+        message = {
+            "type": "metrics",
+            "elapsed": round(time.monotonic() - self.started, 2),
+            "frames": {
+                "received": self.frames_received,
+                "processed": self.frames_processed,
+                "dropped": self.frames_dropped,
+                "with_face": self.aggregator.count,
+            },
+        }
+        if self.latest is not None:
+            message["current_aus"], message["current_metrics"] = split_features(self.latest)
+            message["session"] = self.aggregator.snapshot()
+        return message
+
+    def averages(self):
+        '''(avg_aus, avg_metrics) like the upload pipeline, None if no face was seen'''
+        if not self.aggregator.count:
+            return None, None
+        return split_features(self.aggregator.mean)
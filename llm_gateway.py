@@ -0,0 +1,425 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+# "openai", or "stub" for a local stand-in (offline runs, load tests)
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai")
+LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4")
+# one attempt may take this long...
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+# ...and the whole call, retries and queueing included, this long
+LLM_DEADLINE = float(os.environ.get("LLM_DEADLINE", 60))
+# where a local fallback answer is ready (the rizz_score reading), the LLM
+# gets only this long before the fallback is used
+LLM_ENRICH_DEADLINE = float(os.environ.get("LLM_ENRICH_DEADLINE", 15))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+LLM_BACKOFF_BASE = float(os.environ.get("LLM_BACKOFF_BASE", 0.5))
+# calls in flight at once; the rest wait (against their deadline)
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+LLM_POOL_CONNECTIONS = int(os.environ.get("LLM_POOL_CONNECTIONS", 10))
+LLM_STUB_LATENCY = float(os.environ.get("LLM_STUB_LATENCY", 0.5))
+
+class LLMError(Exception):
+    pass
+
+class LLMTimeout(LLMError):
+    def __init__(self, deadline):
+        super().__init__(f"LLM call did not finish within {deadline:g}s")
+
+class _Deadline:
+    # one call's overall budget: how long it had, and when that runs out
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def extend(self, seconds):
+        # a caller joining a coalesced call keeps it alive for its own deadline
+        self.at = max(self.at, time.monotonic() + seconds)
+        self.seconds = max(self.seconds, seconds)
+
+class RetryableError(LLMError):
+    '''a backend failure worth another attempt (timeouts, 429, 5xx, dropped connections)'''
+
+class OpenAIBackend:
+    '''
+    chat completions over one pooled httpx client per flavour (sync/async),
+    shared by every call. the SDK's own retries are off; the gateway retries.
+    '''
+
+    name = "openai"
+
+    def __init__(self, model=LLM_MODEL, pool_connections=LLM_POOL_CONNECTIONS):
+        self.model = model
+        self.pool_connections = pool_connections
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def _limits(self):
+        import httpx
+        return httpx.Limits(max_connections=self.pool_connections,
+                            max_keepalive_connections=self.pool_connections)
+
+    def _api_key(self):
+        api_key = os.environ.get("OPENAI_API_KEY")
+        if not api_key:
+            raise LLMError("OPENAI_API_KEY environment variable is not set (or use LLM_BACKEND=stub)")
+        return api_key
+
+    def _sdk(self):
+        try:
+            import httpx
+            import openai
+        except ImportError as e:
+            raise LLMError(f"openai SDK not installed ({e}); pip install openai or use LLM_BACKEND=stub") from e
+        return httpx, openai
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                httpx, openai = self._sdk()
+                self._client = openai.OpenAI(api_key=self._api_key(), max_retries=0,
+                                             http_client=httpx.Client(limits=self._limits()))
+            return self._client
+
+    def async_client(self):
+        with self._lock:
+            if self._async_client is None:
+                httpx, openai = self._sdk()
+                self._async_client = openai.AsyncOpenAI(api_key=self._api_key(), max_retries=0,
+                                                        http_client=httpx.AsyncClient(limits=self._limits()))
+            return self._async_client
+
+    def _translate(self, e):
+        if isinstance(e, LLMError):
+            return e
+        import openai
+        retryable = (openai.APITimeoutError, openai.APIConnectionError,
+                     openai.RateLimitError, openai.InternalServerError)
+        if isinstance(e, retryable):
+            return RetryableError(str(e))
+        if isinstance(e, openai.OpenAIError):
+            return LLMError(str(e))
+        return e
+
+    def complete(self, request, timeout):
+        try:
+            response = self.client().chat.completions.create(model=self.model, timeout=timeout, **request)
+        except Exception as e:
+            raise self._translate(e) from e
+        return response.choices[0].message.content
+
+    def stream(self, request, timeout):
+        try:
+            stream = self.client().chat.completions.create(model=self.model, timeout=timeout, stream=True, **request)
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise self._translate(e) from e
+
+    async def acomplete(self, request, timeout):
+        try:
+            response = await self.async_client().chat.completions.create(model=self.model, timeout=timeout, **request)
+        except Exception as e:
+            raise self._translate(e) from e
+        return response.choices[0].message.content
+
+    async def astream(self, request, timeout):
+        try:
+            stream = await self.async_client().chat.completions.create(
+                model=self.model, timeout=timeout, stream=True, **request
+            )
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    yield delta
+        except Exception as e:
+            raise self._translate(e) from e
+
+class StubBackend:
+    '''
+    answers locally after LLM_STUB_LATENCY, streaming a word at a time, so
+    the whole pipeline can run and be load-tested without a key or network.
+    the text depends only on the request, like a cache-friendly model would.
+    '''
+
+    name = "stub"
+
+    def __init__(self, latency=LLM_STUB_LATENCY):
+        self.latency = latency
+        self.calls = 0
+
+    def _text(self, request):
+        digest = hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()[:8]
+        vibe = ["soft rizz", "golden-retriever rizz", "sigma rizz", "awkward rizz"][int(digest, 16) % 4]
+        # JSON when it's asked for, by response_format or (models without JSON mode) the prompt
+        if "response_format" in request or any("JSON" in m["content"] for m in request["messages"]):
+            return json.dumps({
+                "microexpressions": ["relaxed brows", "half-smile"], "emotion": "content",
+                "confidence": 7, "anxiety": 3, "engagement": 8, "vibe": "friendly",
+                "rizz_type": vibe, "explanation": f"[stub {digest}] Easy, open expression.",
+                "roast": "The camera is blushing.",
+            })
+        return (
+            f"[stub {digest}] Relaxed brows and an easy half-smile read as friendly and engaged. "
+            f"Vibe: {vibe}. Verdict: the camera is blushing."
+        )
+
+    def _words(self, request):
+        words = self._text(request).split(" ")
+        return [w + " " for w in words[:-1]] + words[-1:]
+
+    def complete(self, request, timeout):
+        self.calls += 1
+        time.sleep(min(self.latency, timeout))
+        return self._text(request)
+
+    def stream(self, request, timeout):
+        self.calls += 1
+        words = self._words(request)
+        for word in words:
+            time.sleep(self.latency / len(words))
+            yield word
+
+    async def acomplete(self, request, timeout):
+        self.calls += 1
+        await asyncio.sleep(min(self.latency, timeout))
+        return self._text(request)
+
+    async def astream(self, request, timeout):
+        self.calls += 1
+        words = self._words(request)
+        for word in words:
+            await asyncio.sleep(self.latency / len(words))
+            yield word
+
+BACKENDS = {OpenAIBackend.name: OpenAIBackend, StubBackend.name: StubBackend}
+
+def _request_key(request):
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+class LLMGateway:
+    '''
+    every LLM call goes through here: bounded concurrency, per-attempt
+    timeouts, exponential backoff with jitter on retryable errors, and one
+    hard deadline over all of it. identical requests already in flight are
+    coalesced onto the first one's result instead of being sent again.
+
+    `request` is the chat.completions keyword arguments minus the model,
+    e.g. {"messages": [...], "max_tokens": 400}.
+
+    max_concurrency is one limit over sync and async callers together: the
+    async methods poll the same semaphore between short sleeps, so waiting
+    for a slot never ties up a thread.
+    '''
+
+    def __init__(self, backend, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT,
+                 deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "retries": 0, "failures": 0, "timeouts": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _backoff(self, attempt):
+        # full jitter: uniform over [0, base * 2^attempt]
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+    def _remaining(self, deadline_at):
+        remaining = deadline_at.at - time.monotonic()
+        if remaining <= 0:
+            self._count("timeouts")
+            raise LLMTimeout(deadline_at.seconds)
+        return remaining
+
+    def _attempts(self, call, deadline_at):
+        # sync retry loop shared by complete() and stream() setup
+        attempt = 0
+        while True:
+            try:
+                return call(min(self.timeout, self._remaining(deadline_at)))
+            except RetryableError:
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                time.sleep(min(self._backoff(attempt), self._remaining(deadline_at)))
+                attempt += 1
+
+    def _acquire(self, deadline_at):
+        if not self._slots.acquire(timeout=self._remaining(deadline_at)):
+            self._count("timeouts")
+            raise LLMTimeout(deadline_at.seconds)
+
+    def complete(self, request, deadline=None):
+        '''
+        the reply text. deadline (seconds) overrides the gateway's for this
+        call, e.g. a shorter one where a fallback answer is ready
+        '''
+        deadline = deadline or self.deadline
+        key = _request_key(request)
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                shared, deadline_at = self._inflight[key] = Future(), _Deadline(deadline)
+                self._stats["calls"] += 1
+            else:
+                shared, deadline_at = inflight
+                deadline_at.extend(deadline)
+                self._stats["coalesced"] += 1
+        if not leader:
+            try:
+                return shared.result(timeout=deadline)
+            except FutureTimeout:
+                raise LLMTimeout(deadline)
+
+        try:
+            self._acquire(deadline_at)
+            try:
+                result = self._attempts(lambda timeout: self.backend.complete(request, timeout), deadline_at)
+            finally:
+                self._slots.release()
+            shared.set_result(result)
+            return result
+        except BaseException as e:
+            shared.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stream(self, request):
+        '''
+        yields text deltas. retries only happen before the first delta;
+        once text has been shown a failure is raised as-is.
+        '''
+        self._count("calls")
+        deadline_at = _Deadline(self.deadline)
+        self._acquire(deadline_at)
+        try:
+            def first_delta(timeout):
+                deltas = self.backend.stream(request, timeout)
+                return deltas, next(deltas, None)
+
+            deltas, first = self._attempts(first_delta, deadline_at)
+            try:
+                if first is None:
+                    return
+                yield first
+                for delta in deltas:
+                    self._remaining(deadline_at)
+                    yield delta
+            finally:
+                # past the deadline (or the caller stopped): drop the connection
+                deltas.close()
+        finally:
+            self._slots.release()
+
+    async def _aacquire(self, deadline_at):
+        # poll the shared semaphore instead of parking an executor thread on it;
+        # a waiting coroutine costs nothing but its sleeps
+        delay = 0.005
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(min(delay, self._remaining(deadline_at)))
+            delay = min(delay * 2, 0.1)
+
+    async def _aattempts(self, call, deadline_at):
+        attempt = 0
+        while True:
+            try:
+                return await call(min(self.timeout, self._remaining(deadline_at)))
+            except RetryableError:
+                if attempt >= self.max_retries:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                await asyncio.sleep(min(self._backoff(attempt), self._remaining(deadline_at)))
+                attempt += 1
+
+    async def _acomplete(self, request, deadline_at):
+        await self._aacquire(deadline_at)
+        try:
+            return await self._aattempts(lambda timeout: self.backend.acomplete(request, timeout), deadline_at)
+        finally:
+            self._slots.release()
+
+    async def acomplete(self, request, deadline=None):
+        deadline = deadline or self.deadline
+        key = (_request_key(request), asyncio.get_running_loop())
+        with self._lock:
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                deadline_at = _Deadline(deadline)
+                task = asyncio.ensure_future(self._acomplete(request, deadline_at))
+                self._inflight[key] = (task, deadline_at)
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                self._stats["calls"] += 1
+            else:
+                task, deadline_at = inflight
+                # the shared call runs until its longest-waiting caller gives up
+                deadline_at.extend(deadline)
+                self._stats["coalesced"] += 1
+        # shield: one caller going away mustn't cancel the call for the others.
+        # each caller still stops waiting at its own deadline
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), deadline)
+        except asyncio.TimeoutError:
+            raise LLMTimeout(deadline)
+
+    async def astream(self, request):
+        self._count("calls")
+        deadline_at = _Deadline(self.deadline)
+        await self._aacquire(deadline_at)
+        try:
+            async def first_delta(timeout):
+                deltas = self.backend.astream(request, timeout)
+                try:
+                    return deltas, await deltas.__anext__()
+                except StopAsyncIteration:
+                    return deltas, None
+
+            deltas, first = await self._aattempts(first_delta, deadline_at)
+            try:
+                if first is None:
+                    return
+                yield first
+                async for delta in deltas:
+                    self._remaining(deadline_at)
+                    yield delta
+            finally:
+                # past the deadline (or the caller stopped): drop the connection
+                await deltas.aclose()
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._inflight)
+        stats.update(backend=self.backend.name, max_concurrency=self.max_concurrency)
+        return stats
+
+def make_gateway(name=LLM_BACKEND):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown LLM backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return LLMGateway(BACKENDS[name]())
+
+gateway = make_gateway()
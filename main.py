@@ -1,5 +1,4 @@
 import cv2
-import onnxruntime as ort
 import librosa
 import numpy as np
 import sounddevice as sd
@@ -9,22 +8,26 @@ pending = False
 lock = threading.Lock()
 
 import wave
-import whisper
+from concurrent.futures import ThreadPoolExecutor
+from transcription import load_backend
 from openai_call import interpret_expression
-from metrics import compute_metrics
 import time
 last_interpret_time = 0
 interpretation_text = "..."
 
-from au_feature import compute_aus
-#from audio_analyzer import analyze_audio, format_results
+from au_feature import landmarks_to_array
+from feature_engine import FEATURE_NAMES, compute_features_batch, split_features
+from session_stats import SessionAggregator
+from models import EMOTION_MODEL_PATH
+from onnx_session import create_session
+from audio_demux import WHISPER_SAMPLE_RATE
+from vad import NO_SPEECH, trim_silence
+from audio_analyzer import analyze_audio
+from rizz_score import describe, rizz_score
 sd.default.device = (2, None) 
 
-session_data = {
-    "aus": [],
-    "metrics": [],
-    "timestamps": [],
-}
+# running stats over every frame with a face; fixed memory however long it runs
+session = SessionAggregator(FEATURE_NAMES)
 
 SESSION_DURATION = 10
 AUDIO_FILENAME = "temp_audio.wav"
@@ -47,13 +50,27 @@ def record_audio_blocking(duration):
     print(f"Audio saved to {AUDIO_FILENAME}")
     return audio
 
+# whisper loads while the session runs instead of after it
+background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="background")
+whisper_future = background.submit(load_backend)
+
+def record_and_transcribe(duration):
+    # runs as soon as the recording is done, alongside the end of the video loop
+    audio = record_audio_blocking(duration)
+    recorded = librosa.resample(audio.flatten(), orig_sr=sr, target_sr=WHISPER_SAMPLE_RATE)
+    voice = analyze_audio(recorded, WHISPER_SAMPLE_RATE)
+    # trim the silence around the speech before whisper sees it
+    speech = trim_silence(recorded)
+    if speech is None:
+        return voice, NO_SPEECH
+    print("[WHISPER] Transcribing audio...")
+    return voice, whisper_future.result().transcribe(speech)
+
 start_time = time.time()
 
-audio_thread = threading.Thread(target=record_audio_blocking, args=(SESSION_DURATION,), daemon=False)
-audio_thread.start()
+audio_future = background.submit(record_and_transcribe, SESSION_DURATION)
 
 mp_face = mp.solutions.face_mesh
-face_mesh = mp_face.FaceMesh(max_num_faces=1, refine_landmarks=True)
 stream = cv2.VideoCapture(0)
 stream.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
 stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
@@ -61,19 +78,13 @@ stream.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
 # install librosa:
 # pip install librosa sounddevice numpy opencv-python
 
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
-
-
-stream = cv2.VideoCapture(0)
-mp_face = mp.solutions.face_mesh
-
 
 if not stream.isOpened():
     print("could not access webcam")
     exit()
 
 # ONNX emotion detection
-emotion_session = ort.InferenceSession("emotion.onnx")
+emotion_session = create_session(EMOTION_MODEL_PATH)
 input_name = emotion_session.get_inputs()[0].name
 output_name = emotion_session.get_outputs()[0].name
 
@@ -121,32 +132,105 @@ face_mesh = mp_face.FaceMesh(
     refine_landmarks = True
 )
 
-
-frame_count = 0
-while True:
-    ret, frame = stream.read()
-    if not ret:
-        print("no more stream")
-        break
-    if time.time() - start_time > SESSION_DURATION:
-        print("session complete")
-        break
-
-    frame = cv2.flip(frame, 1)
-    h, w, _ = frame.shape
-    
-    results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-    
-    if results.multi_face_landmarks:
-        landmarks = results.multi_face_landmarks[0].landmark
-        aus = compute_aus(landmarks, frame.shape[1], frame.shape[0])
-        metrics = compute_metrics(landmarks, frame.shape[1], frame.shape[0])
-
-        if isinstance(aus, dict) and isinstance(metrics, dict):
-            session_data["aus"].append(aus)
-            session_data["metrics"].append(metrics)
-            session_data["timestamps"].append(time.time() - start_time)
-
+class LatestSlot:
+    '''
+    holds only the newest item. readers remember the last sequence number
+    they saw and wait for a newer one, so a slow reader skips stale items
+    instead of queueing them.
+    '''
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.item = None
+        self.seq = 0
+
+    def put(self, item):
+        with self.cond:
+            self.item = item
+            self.seq += 1
+            self.cond.notify_all()
+
+    def get(self, last_seq, timeout=0.1):
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > last_seq, timeout)
+            if self.seq == last_seq:
+                return last_seq, None
+            return self.seq, self.item
+
+class Rate:
+    # smoothed events per second
+    def __init__(self):
+        self.last = None
+        self.value = 0.0
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.value = 0.9 * self.value + 0.1 / max(now - self.last, 1e-6)
+        self.last = now
+
+stop = threading.Event()
+frames = LatestSlot()     # (capture time, mirrored BGR frame)
+overlay = LatestSlot()    # (aus, capture-to-features latency) of the newest analyzed frame
+capture_fps, inference_fps = Rate(), Rate()
+dropped = 0
+
+def capture_loop():
+    while not stop.is_set():
+        ret, frame = stream.read()
+        if not ret:
+            print("no more stream")
+            break
+        if time.time() - start_time > SESSION_DURATION:
+            print("session complete")
+            break
+        frames.put((time.perf_counter(), cv2.flip(frame, 1)))
+        capture_fps.tick()
+    stop.set()
+
+def inference_loop():
+    global dropped
+    seen = 0
+    while not stop.is_set():
+        seq, item = frames.get(seen)
+        if item is None:
+            continue
+        # frames that arrived while we were busy are skipped, not queued
+        dropped += seq - seen - 1
+        seen = seq
+        captured, frame = item
+        h, w, _ = frame.shape
+        results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        inference_fps.tick()
+        if results.multi_face_landmarks:
+            landmarks = results.multi_face_landmarks[0].landmark
+            features = compute_features_batch(landmarks_to_array(landmarks), w, h)[0]
+            session.update(features, time.time() - start_time)
+            aus, metrics = split_features(features)
+            # the local score is cheap enough to run on every frame
+            overlay.put((aus, rizz_score(aus, metrics), time.perf_counter() - captured))
+
+workers = [
+    threading.Thread(target=capture_loop, name="capture", daemon=True),
+    threading.Thread(target=inference_loop, name="inference", daemon=True),
+]
+for t in workers:
+    t.start()
+
+# display stays on the main thread (required by imshow on some platforms)
+shown = 0
+latest_overlay = None
+while not stop.is_set():
+    shown, item = frames.get(shown)
+    if item is None:
+        continue
+    frame = item[1].copy()
+    _, fresh = overlay.get(0, timeout=0)
+    if fresh is not None:
+        latest_overlay = fresh
+
+    if latest_overlay is not None:
+        aus, score, latency = latest_overlay
         cv2.putText(
             frame,
             f"AU12 (smile): {aus['AU12']:.2f}",
@@ -156,32 +240,53 @@ while True:
             (0, 255, 0),
             2
         )
- 
+        cv2.putText(
+            frame,
+            f"rizz: {score['rizz']:.0f} ({score['label']})",
+            (10, 200),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.7,
+            (0, 255, 0),
+            2
+        )
+        cv2.putText(
+            frame,
+            f"latency: {latency * 1000:.0f} ms",
+            (10, 60),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (0, 255, 0),
+            2
+        )
+    cv2.putText(
+        frame,
+        f"capture {capture_fps.value:.0f} fps | inference {inference_fps.value:.0f} fps | dropped {dropped}",
+        (10, 30),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.6,
+        (0, 255, 0),
+        2
+    )
+
     cv2.imshow("webcam", frame)
     if cv2.waitKey(1) == ord('q'):
-        break
+        stop.set()
 
-audio_thread.join()
+for t in workers:
+    t.join()
 
-print("[WHISPER] Transcribing audio...")
-model = whisper.load_model("tiny.en")
-result = model.transcribe(AUDIO_FILENAME, fp16=False, without_timestamps=True)
-transcribed_text = result["text"]
+voice, transcribed_text = audio_future.result()
+print("\n[VOICE]")
+print(voice)
 print("\n[TRANSCRIPTION]")
 print(transcribed_text)
 print("---------------------------------\n")
 
-def avg_dict_list(dict_list):
-    if not dict_list:
-        return {}
-    keys = dict_list[0].keys()
-    return {
-        k: float(np.mean([d[k] for d in dict_list]))
-        for k in keys
-    }
+avg_aus, avg_metrics = split_features(session.mean) if session.count else ({}, {})
 
-avg_aus = avg_dict_list(session_data["aus"])
-avg_metrics = avg_dict_list(session_data["metrics"])
+if avg_aus:
+    print("\n[SCORE]")
+    print(describe(rizz_score(avg_aus, avg_metrics)))
 
 report = interpret_expression(avg_aus, avg_metrics)
 print(report)
@@ -189,4 +294,3 @@ print(report)
 stream.release()
 cv2.destroyAllWindows()
 cv2.waitKey(200)
-
@@ -1,74 +1,73 @@
-import math
+import numpy as np
 
-def dist(a, b):
-    return math.sqrt((a.x - b.x) ** 2 + (a.y - b.y) ** 2)
+from au_feature import landmarks_to_array
+
+METRIC_NAMES = (
+    "head_tilt",
+    "eye_openness",
+    "smile_symmetry",
+    "brow_symmetry",
+    "mouth_openness",
+    "tension_index",
+    "confidence_index",
+)
+
+def _dist(a, b):
+    d = a - b
+    return np.sqrt(d[..., 0] * d[..., 0] + d[..., 1] * d[..., 1])
+
+def _symmetry(a, b):
+    total = a + b
+    safe = np.where(total == 0, 1.0, total)
+    return np.where(total == 0, 1.0, 1.0 - np.abs(a - b) / safe)
+
+def _ratio(num, den):
+    safe = np.where(den > 0, den, 1.0)
+    return np.where(den > 0, num / safe, 0.0)
+
+def compute_metrics_batch(points, w, h):
+    '''
+    points: (n_frames, n_landmarks, 2 or 3) normalized landmark array
+    w, h: frame size, scalar or one per frame
+    returns (n_frames, len(METRIC_NAMES)) float64 array, columns in METRIC_NAMES order
+    '''
+    points = np.asarray(points)
+    if points.ndim == 2:
+        points = points[None]
+
+    # distances are measured in normalized coords, only head tilt uses pixels
+    lm = points[..., :2].astype(np.float64)
+
+    out = np.empty((lm.shape[0], len(METRIC_NAMES)), dtype=np.float64)
+
+    w = np.asarray(w, dtype=np.float64)
+    h = np.asarray(h, dtype=np.float64)
+    lx, ly = lm[:, 33, 0] * w, lm[:, 33, 1] * h
+    rx, ry = lm[:, 263, 0] * w, lm[:, 263, 1] * h
+    out[:, 0] = np.degrees(np.arctan2(ry - ly, rx - lx))
+
+    topb = _dist(lm[:, 159], lm[:, 145])
+    eye_width = _dist(lm[:, 133], lm[:, 33])
+    out[:, 1] = _ratio(topb, eye_width)
+
+    lip_top = lm[:, 13]
+    out[:, 2] = _symmetry(_dist(lm[:, 61], lip_top), _dist(lm[:, 291], lip_top))
+
+    eye_center = lm[:, 168]
+    out[:, 3] = _symmetry(_dist(lm[:, 70], eye_center), _dist(lm[:, 300], eye_center))
+
+    mouth_open = _dist(lm[:, 13], lm[:, 14])
+    face_h = _dist(lm[:, 152], lm[:, 10])
+    out[:, 4] = _ratio(mouth_open, face_h)
+
+    tension = np.abs(topb - _dist(lm[:, 386], lm[:, 374]))
+    out[:, 5] = np.clip(tension * 5, 0, 1)
+
+    confidence = (out[:, 2] * 0.4) + (out[:, 1] * 0.3) + (1 - out[:, 5]) * 0.3
+    out[:, 6] = np.clip(confidence, 0.0, 1.0)
+
+    return out
 
 def compute_metrics(landmarks, w, h):
-    def px(lm):
-        return (lm.x * w, lm.y * h)
-
-    left_eye = landmarks[33]
-    right_eye = landmarks[263]
-
-    lx, ly = px(left_eye)
-    rx, ry = px(right_eye)
-
-    head_tilt = math.degrees(math.atan2(ry - ly, rx - lx))
-
-    eye_top = landmarks[159]
-    eye_bottom = landmarks[145]
-    topb = dist(eye_top, eye_bottom)
-    
-    eye_left_corner = landmarks[133]
-    eye_right_corner = landmarks[33]
-    eye_width = dist(eye_left_corner, eye_right_corner)
-    eye_openness = (topb / eye_width) if eye_width > 0 else 0
-
-    lip_left = landmarks[61]
-    lip_right = landmarks[291]
-    lip_top = landmarks[13]
-
-    left_dist = dist(lip_left, lip_top)
-    right_dist = dist(lip_right, lip_top)
-
-    if left_dist + right_dist == 0:
-        smile_symmetry = 1.0
-    else:
-        smile_symmetry = 1.0 - abs(left_dist - right_dist) / (left_dist + right_dist)
-
-    brow_left = landmarks[70]
-    brow_right = landmarks[300]
-    eye_center = landmarks[168]
-
-    left_brow_dist = dist(brow_left, eye_center)
-    right_brow_dist = dist(brow_right, eye_center)
-
-    if left_brow_dist + right_brow_dist == 0:
-        brow_symmetry = 1.0
-    else:
-        brow_symmetry = 1.0 - abs(left_brow_dist - right_brow_dist) / (left_brow_dist + right_brow_dist)
-    
-    mouth_top = landmarks[13]
-    mouth_bottom = landmarks[14]
-    mouth_open = dist(mouth_top, mouth_bottom)
-
-    chin = landmarks[152]
-    forehead = landmarks[10]
-    face_h = dist(chin, forehead)
-    mouth_openness = (mouth_open / face_h) if face_h > 0 else 0
-
-    tension = abs(dist(landmarks[159], landmarks[145]) - dist(landmarks[386], landmarks[374]))
-    tension_index = min(max(tension * 5, 0), 1)
-
-    confidence_index = ((smile_symmetry * 0.4) + (eye_openness * 0.3) + (1 - tension_index) * 0.3)
-    confidence_index = max(0.0, min(1.0, confidence_index))
-
-    return {
-        "head_tilt": head_tilt,
-        "eye_openness": eye_openness,
-        "smile_symmetry": smile_symmetry,
-        "brow_symmetry": brow_symmetry,
-        "mouth_openness": mouth_openness,
-        "tension_index": tension_index,
-        "confidence_index": confidence_index
-    }
\ No newline at end of file
+    row = compute_metrics_batch(landmarks_to_array(landmarks), w, h)[0]
+    return {name: float(v) for name, v in zip(METRIC_NAMES, row)}
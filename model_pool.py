@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+class PoolTimeout(Exception):
+    pass
+
+class ModelPool:
+    '''
+    hands out model instances one caller at a time.
+
+    instances are built by `factory` on demand, up to `size`, and returned to
+    the pool after use, so stateful models (FaceMesh's tracker, whisper's kv
+    cache hooks) are never shared between concurrent requests.
+    '''
+
+    def __init__(self, name, factory, size=2):
+        self.name = name
+        self.factory = factory
+        self.size = max(1, int(size))
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def _try_create(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def acquire(self, timeout=None):
+        t0 = time.perf_counter()
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            model = self._try_create()
+            if model is None:
+                try:
+                    model = self._idle.get(timeout=timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"no {self.name} instance free after {timeout}s")
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return model
+
+    def release(self, model):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(model)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        model = self.acquire(timeout)
+        try:
+            yield model
+        finally:
+            self.release(model)
+
+    def prefill(self, count=1):
+        # build instances now instead of on the first request
+        models = []
+        for _ in range(min(count, self.size)):
+            model = self._try_create()
+            if model is None:
+                break
+            models.append(model)
+        for model in models:
+            self._idle.put(model)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+            }
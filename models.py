@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+
+from model_pool import ModelPool
+from transcription import backend_id, load_backend
+
+ROOT = Path(__file__).parent
+EMOTION_MODEL_PATH = ROOT / "emotion.onnx"
+# names the configured transcription engine + weights, for cache keys
+TRANSCRIBER = backend_id()
+
+# one instance per concurrent request; the deploy configs run --threads 2
+POOL_SIZE = int(os.environ.get("MODEL_POOL_SIZE", 2))
+# how long an upload waits for a free instance before it is answered 503
+POOL_WAIT = float(os.environ.get("MODEL_POOL_WAIT", 30))
+# /live sessions hold a FaceMesh for their whole length, so they get their
+# own instances (one per LIVE_MAX_SESSIONS session) instead of starving uploads
+LIVE_FACE_MESH_POOL_SIZE = int(os.environ.get("LIVE_FACE_MESH_POOL_SIZE", os.environ.get("LIVE_MAX_SESSIONS", 4)))
+
+def make_face_mesh():
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
+
+def make_whisper():
+    # TRANSCRIBE_BACKEND / WHISPER_MODEL pick the engine
+    return load_backend()
+
+EMOTION_POOL_SIZE = int(os.environ.get("EMOTION_POOL_SIZE", POOL_SIZE))
+
+def make_emotion_session():
+    from onnx_session import create_session
+    # split the cores between the sessions that can run at once
+    intra_op_threads = max(1, (os.cpu_count() or 1) // EMOTION_POOL_SIZE)
+    return create_session(EMOTION_MODEL_PATH, intra_op_threads=intra_op_threads)
+
+face_mesh_pool = ModelPool(
+    "face_mesh", make_face_mesh, int(os.environ.get("FACE_MESH_POOL_SIZE", POOL_SIZE))
+)
+live_face_mesh_pool = ModelPool("live_face_mesh", make_face_mesh, LIVE_FACE_MESH_POOL_SIZE)
+whisper_pool = ModelPool(
+    "whisper", make_whisper, int(os.environ.get("WHISPER_POOL_SIZE", POOL_SIZE))
+)
+emotion_pool = ModelPool("emotion", make_emotion_session, EMOTION_POOL_SIZE)
+
+def pool_stats():
+    return {pool.name: pool.stats() for pool in (face_mesh_pool, live_face_mesh_pool, whisper_pool, emotion_pool)}
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+
+import onnxruntime as ort
+
+from digests import file_digest
+
+ROOT = Path(__file__).parent
+
+# 0 lets onnxruntime pick (all cores), which oversubscribes once several
+# sessions run at the same time; callers pass a per-session share instead
+INTRA_OP_THREADS = os.environ.get("ORT_INTRA_OP_THREADS")
+INTER_OP_THREADS = int(os.environ.get("ORT_INTER_OP_THREADS", 1))
+EXECUTION_MODE = os.environ.get("ORT_EXECUTION_MODE", "sequential")
+GRAPH_OPT_LEVEL = os.environ.get("ORT_GRAPH_OPT_LEVEL", "all")
+# optimized / quantized models are written here and reused on later startups
+MODEL_CACHE_DIR = Path(os.environ.get("ORT_MODEL_CACHE_DIR", ROOT / ".ort_cache"))
+# "int8" swaps in a dynamically quantized copy of the model
+MODEL_VARIANT = os.environ.get("ORT_MODEL_VARIANT", "fp32")
+PROVIDERS = ["CPUExecutionProvider"]
+
+_EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+_OPT_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+def _cpu_tag():
+    # graph optimization at "all" specializes kernels/layouts for the CPU it
+    # ran on, so a cache dir copied to another machine type must miss
+    info = platform.processor()
+    try:
+        with open("/proc/cpuinfo") as f:
+            info = "".join(line for line in f if line.startswith(("model name", "flags")))
+    except OSError:
+        pass
+    return f"{platform.machine()}-{hashlib.sha256(info.encode()).hexdigest()[:8]}"
+
+def _source_tag(model_path):
+    # cached files are tied to the exact source model bytes, the onnxruntime
+    # that wrote them and the providers/CPU they were optimized for
+    providers = "+".join(p.replace("ExecutionProvider", "").lower() for p in PROVIDERS)
+    return (f"{Path(model_path).stem}-{file_digest(model_path)[:12]}"
+            f"-ort{ort.__version__}-{providers}-{_cpu_tag()}")
+
+def quantized_model(model_path):
+    '''int8 dynamic-quantized copy of model_path, built once and cached'''
+    target = MODEL_CACHE_DIR / f"{_source_tag(model_path)}.int8.onnx"
+    if not target.exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        t0 = time.perf_counter()
+        quantize_dynamic(str(model_path), str(tmp), weight_type=QuantType.QInt8)
+        os.replace(tmp, target)
+        print(f"quantized {model_path} -> {target} in {time.perf_counter() - t0:.1f}s")
+    return target
+
+def session_options(intra_op_threads=None, opt_level=GRAPH_OPT_LEVEL):
+    options = ort.SessionOptions()
+    if INTRA_OP_THREADS is not None:
+        intra_op_threads = int(INTRA_OP_THREADS)
+    if intra_op_threads is not None:
+        options.intra_op_num_threads = intra_op_threads
+    options.inter_op_num_threads = INTER_OP_THREADS
+    options.execution_mode = _EXECUTION_MODES[EXECUTION_MODE]
+    options.graph_optimization_level = _OPT_LEVELS[opt_level]
+    return options
+
+def create_session(model_path, intra_op_threads=None, variant=MODEL_VARIANT):
+    '''
+    InferenceSession configured from the ORT_* environment.
+
+    the first load runs graph optimization and saves the result under
+    MODEL_CACHE_DIR; later startups load that file with optimization turned
+    off, which is most of session-creation time on a cold start.
+    '''
+    model_path = Path(model_path)
+    if variant == "int8":
+        model_path = quantized_model(model_path)
+
+    optimized = MODEL_CACHE_DIR / f"{_source_tag(model_path)}.{GRAPH_OPT_LEVEL}.onnx"
+    t0 = time.perf_counter()
+    if GRAPH_OPT_LEVEL != "disable" and optimized.exists():
+        session = ort.InferenceSession(
+            str(optimized),
+            sess_options=session_options(intra_op_threads, opt_level="disable"),
+            providers=PROVIDERS,
+        )
+        print(f"loaded optimized {optimized.name} in {time.perf_counter() - t0:.2f}s")
+        return session
+
+    options = session_options(intra_op_threads)
+    tmp = None
+    if GRAPH_OPT_LEVEL != "disable":
+        MODEL_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp = optimized.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+        options.optimized_model_filepath = str(tmp)
+    session = ort.InferenceSession(str(model_path), sess_options=options, providers=PROVIDERS)
+    if tmp is not None and tmp.exists():
+        os.replace(tmp, optimized)
+    print(f"loaded {model_path.name} in {time.perf_counter() - t0:.2f}s")
+    return session
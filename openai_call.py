@@ -1,35 +1,86 @@
-from openai import OpenAI
-import json
-import os
-
-api_key = os.environ.get("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY environment variable is not set. Please set it before running the application.")
-
-client = OpenAI(api_key=api_key)
-
-def interpret_expression(aus, metrics):
-    prompt = f"""
-    You are a world-class psychologist, behavioral scientist, and microexpression expert. You analyze facial Action Units (AUs), subtle muscle activity, and geometric facial cues to understand emotional state, confidence, social energy, and fliriting behavior.
-
-    Here are the inputs:
-
-    Action Units (AUs): {json.dumps(aus, indent=2)}
-    Psychological Metrics: {json.dumps(metrics, indent=2)}
-    
-    Analyze the following clearly and scientifically:
-    1. What microexpressions are present?
-    2. What emotion or psychological state does this imply?
-    3. What level of confidence, anciety, and social engagement is shown?
-    4. What type of social vibe is the person giving (friendly, nervous, intense, playful)?
-    5. What "rizz energy" does this match (e.g., soft rizz, sigma rizz, golden-retriever rizz, god-tier rizz, cringe rizz, awkward rizz, etc.)?
-    6. Give a human-friendly explanation (1 short paragraph).
-    7. Then give a one-sentence fun Tiktok and Gen-Z roast or compliment.
-    """
-
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}]
-    )
-
-    return response.choices[0].message.content
\ No newline at end of file
+from llm_gateway import LLM_ENRICH_DEADLINE, LLM_MODEL, LLMError, gateway
+from prompts import LLM_OUTPUT, build_request, prompt_id, render
+from result_cache import feature_key, interpretation_cache
+from rizz_score import describe
+
+def cache_key(aus, metrics):
+    # answers from another backend (the stub) or model must not be served
+    # from a RESULT_CACHE_DIR that outlived the config change
+    return f"{gateway.backend.name}-{LLM_MODEL}-{prompt_id()}-{feature_key(aus, metrics)}"
+
+def interpret_expression(aus, metrics, deadline=None):
+    key = cache_key(aus, metrics)
+    cached = interpretation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    interpretation = render(gateway.complete(build_request(aus, metrics), deadline))
+    interpretation_cache.set(key, interpretation)
+    return interpretation
+
+async def interpret_expression_async(aus, metrics, deadline=None):
+    # same call on the async client, so the FastAPI event loop isn't blocked
+    key = cache_key(aus, metrics)
+    cached = interpretation_cache.get(key)
+    if cached is not None:
+        return cached
+
+    interpretation = render(await gateway.acomplete(build_request(aus, metrics), deadline))
+    interpretation_cache.set(key, interpretation)
+    return interpretation
+
+def interpret_or_describe(aus, metrics, score):
+    # the LLM narrative is enrichment: if it's down or slow, answer from the local score
+    try:
+        return interpret_expression(aus, metrics, LLM_ENRICH_DEADLINE)
+    except LLMError as e:
+        print(f"LLM unavailable, using the local score: {e}")
+        return describe(score)
+
+async def interpret_or_describe_async(aus, metrics, score):
+    try:
+        return await interpret_expression_async(aus, metrics, LLM_ENRICH_DEADLINE)
+    except LLMError as e:
+        print(f"LLM unavailable, using the local score: {e}")
+        return describe(score)
+
+def stream_interpretation(aus, metrics):
+    '''
+    yields the interpretation as it is generated, so the first words can be
+    shown while the rest is still coming. the full text is cached once the
+    stream completes; a cache hit yields it in one piece. JSON output can't
+    be shown half-parsed, so it is rendered and yielded once complete.
+    '''
+    key = cache_key(aus, metrics)
+    cached = interpretation_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    for delta in gateway.stream(build_request(aus, metrics)):
+        parts.append(delta)
+        if LLM_OUTPUT != "json":
+            yield delta
+    interpretation = render("".join(parts))
+    if LLM_OUTPUT == "json":
+        yield interpretation
+    interpretation_cache.set(key, interpretation)
+
+async def stream_interpretation_async(aus, metrics):
+    # stream_interpretation on the async client
+    key = cache_key(aus, metrics)
+    cached = interpretation_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    async for delta in gateway.astream(build_request(aus, metrics)):
+        parts.append(delta)
+        if LLM_OUTPUT != "json":
+            yield delta
+    interpretation = render("".join(parts))
+    if LLM_OUTPUT == "json":
+        yield interpretation
+    interpretation_cache.set(key, interpretation)
@@ -0,0 +1,183 @@
+import json
+import os
+
+from llm_gateway import LLM_MODEL
+
+# "compact" (static system prompt + rounded features) or "legacy" (the
+# original single free-text prompt, kept for comparison)
+LLM_PROMPT = os.environ.get("LLM_PROMPT", "compact")
+# "text" streams prose; "json" asks for LLM_SCHEMA and renders it to prose
+LLM_OUTPUT = os.environ.get("LLM_OUTPUT", "text")
+# output budget per compact-prompt call; 0 leaves it to the model. the legacy
+# prompt is never capped, so it still answers as it always did
+LLM_MAX_TOKENS = int(os.environ.get("LLM_MAX_TOKENS", 250))
+# features are sent with this many decimals; more is noise to the model
+PROMPT_DECIMALS = int(os.environ.get("PROMPT_DECIMALS", 2))
+
+PERSONA = (
+    "You are a psychologist and microexpression expert. You read facial Action Unit "
+    "intensities (AUs) and geometric metrics from a short clip and judge emotional state, "
+    "confidence, social energy and flirting behavior."
+)
+
+TEXT_SYSTEM_PROMPT = PERSONA + (
+    " Reply in under 120 words of plain text, in this order: microexpressions present; "
+    "implied emotion; confidence, anxiety and engagement (0-10 each); social vibe "
+    "(friendly, nervous, intense or playful); rizz type (e.g. soft, sigma, golden-retriever, "
+    "god-tier, cringe, awkward rizz); a 1-2 sentence explanation; then a one-sentence "
+    "Gen-Z roast or compliment."
+)
+
+JSON_SYSTEM_PROMPT = PERSONA + (
+    " Fill in the response schema. Keep strings short: explanation at most 2 sentences, "
+    "roast one sentence."
+)
+
+# models without structured outputs don't get the schema, so the keys are
+# spelled out instead (JSON mode also needs the word "JSON" in the messages)
+JSON_KEYS_PROMPT = (
+    "Reply with one JSON object with these keys: microexpressions (list of strings), "
+    "emotion, confidence, anxiety and engagement (integers 0-10), vibe (friendly, nervous, "
+    "intense or playful), rizz_type, explanation (at most 2 sentences) and roast (one sentence)."
+)
+JSON_MODE_SYSTEM_PROMPT = PERSONA + " " + JSON_KEYS_PROMPT
+
+# model name prefixes that accept a strict json_schema response_format...
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+# ...and {"type": "json_object"}; any other model (gpt-4 itself) would answer
+# 400 to either, so it only gets asked for JSON in the prompt
+JSON_MODE_MODELS = STRUCTURED_OUTPUT_MODELS + ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+
+LLM_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "microexpressions": {"type": "array", "items": {"type": "string"}},
+        "emotion": {"type": "string"},
+        "confidence": {"type": "integer"},
+        "anxiety": {"type": "integer"},
+        "engagement": {"type": "integer"},
+        "vibe": {"type": "string", "enum": ["friendly", "nervous", "intense", "playful"]},
+        "rizz_type": {"type": "string"},
+        "explanation": {"type": "string"},
+        "roast": {"type": "string"},
+    },
+    "required": [
+        "microexpressions", "emotion", "confidence", "anxiety", "engagement",
+        "vibe", "rizz_type", "explanation", "roast",
+    ],
+    "additionalProperties": False,
+}
+
+def legacy_prompt(aus, metrics):
+    return f"""
+    You are a world-class psychologist, behavioral scientist, and microexpression expert. You analyze facial Action Units (AUs), subtle muscle activity, and geometric facial cues to understand emotional state, confidence, social energy, and fliriting behavior.
+
+    Here are the inputs:
+
+    Action Units (AUs): {json.dumps(aus, indent=2)}
+    Psychological Metrics: {json.dumps(metrics, indent=2)}
+
+    Analyze the following clearly and scientifically:
+    1. What microexpressions are present?
+    2. What emotion or psychological state does this imply?
+    3. What level of confidence, anciety, and social engagement is shown?
+    4. What type of social vibe is the person giving (friendly, nervous, intense, playful)?
+    5. What "rizz energy" does this match (e.g., soft rizz, sigma rizz, golden-retriever rizz, god-tier rizz, cringe rizz, awkward rizz, etc.)?
+    6. Give a human-friendly explanation (1 short paragraph).
+    7. Then give a one-sentence fun Tiktok and Gen-Z roast or compliment.
+    """
+
+def encode_features(values, decimals=PROMPT_DECIMALS):
+    # {"AU01": 0.123456, ...} -> "AU01=0.12 ..."; :g drops trailing zeros
+    return " ".join(f"{name}={round(float(v), decimals):g}" for name, v in values.items())
+
+def features_message(aus, metrics, decimals=PROMPT_DECIMALS):
+    # the only part of a compact request that changes between calls
+    return f"AUs: {encode_features(aus, decimals)}\nMetrics: {encode_features(metrics, decimals)}"
+
+def json_response_format(model=LLM_MODEL):
+    # the strictest JSON the model accepts, None if it takes neither
+    if model.startswith(STRUCTURED_OUTPUT_MODELS):
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "rizz_read", "schema": LLM_SCHEMA, "strict": True},
+        }
+    if model.startswith(JSON_MODE_MODELS):
+        return {"type": "json_object"}
+    return None
+
+def check_output_mode(output=LLM_OUTPUT, model=LLM_MODEL):
+    '''a startup warning when LLM_OUTPUT=json can't get schema-checked replies'''
+    if output != "json" or model.startswith(STRUCTURED_OUTPUT_MODELS):
+        return None
+    if model.startswith(JSON_MODE_MODELS):
+        return f"LLM_MODEL={model} has no structured outputs; LLM_OUTPUT=json uses JSON mode without the schema"
+    return (f"LLM_MODEL={model} supports neither structured outputs nor JSON mode; LLM_OUTPUT=json only "
+            f"asks for JSON in the prompt, and replies that don't parse are shown as-is. "
+            f"use e.g. LLM_MODEL=gpt-4o-mini, or LLM_OUTPUT=text")
+
+def build_request(aus, metrics, prompt=LLM_PROMPT, output=LLM_OUTPUT, max_tokens=None,
+                  model=LLM_MODEL):
+    '''
+    chat.completions arguments for the gateway, minus the model (which only
+    decides how LLM_OUTPUT=json is asked for: see json_response_format).
+
+    the compact system prompt is identical on every call, so it sits first
+    where provider-side prompt caching can reuse it; only the short features
+    message varies. max_tokens=None means LLM_MAX_TOKENS for the compact
+    prompts and no cap for the legacy one.
+    '''
+    if max_tokens is None:
+        max_tokens = 0 if prompt == "legacy" else LLM_MAX_TOKENS
+    response_format = json_response_format(model) if output == "json" else None
+    schema = response_format is not None and response_format["type"] == "json_schema"
+    if prompt == "legacy":
+        request = {"messages": [{"role": "user", "content": legacy_prompt(aus, metrics)}]}
+        if output == "json" and not schema:
+            request["messages"].insert(0, {"role": "system", "content": JSON_KEYS_PROMPT})
+    else:
+        if output != "json":
+            system = TEXT_SYSTEM_PROMPT
+        else:
+            system = JSON_SYSTEM_PROMPT if schema else JSON_MODE_SYSTEM_PROMPT
+        request = {"messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": features_message(aus, metrics)},
+        ]}
+    if response_format is not None:
+        request["response_format"] = response_format
+    if max_tokens:
+        request["max_tokens"] = max_tokens
+    return request
+
+_warning = check_output_mode()
+if _warning:
+    print(f"warning: {_warning}")
+
+def prompt_id(prompt=LLM_PROMPT, output=LLM_OUTPUT):
+    # part of the interpretation cache key, so switching prompts doesn't serve old answers
+    return f"{prompt}-{output}"
+
+def render(text, output=LLM_OUTPUT):
+    '''
+    the model's reply as the prose the clients show. JSON replies are laid out
+    field by field; anything that doesn't parse is passed through unchanged.
+    '''
+    if output != "json":
+        return text
+    try:
+        read = json.loads(text)
+        return "\n".join([
+            f"Microexpressions: {', '.join(read['microexpressions'])}",
+            f"Emotion: {read['emotion']}",
+            f"Confidence {read['confidence']}/10, anxiety {read['anxiety']}/10, "
+            f"engagement {read['engagement']}/10",
+            f"Vibe: {read['vibe']}",
+            f"Rizz: {read['rizz_type']}",
+            "",
+            read["explanation"],
+            "",
+            read["roast"],
+        ])
+    except (ValueError, KeyError, TypeError):
+        return text
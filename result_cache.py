@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+CACHE_ENTRIES = int(os.environ.get("RESULT_CACHE_ENTRIES", 256))
+CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 3600))
+CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# unset keeps everything in memory
+CACHE_DIR = os.environ.get("RESULT_CACHE_DIR")
+
+LLM_CACHE_ENTRIES = int(os.environ.get("LLM_CACHE_ENTRIES", 1024))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 24 * 3600))
+# AU/metric values are rounded to this many decimals before keying the LLM cache
+LLM_CACHE_DECIMALS = int(os.environ.get("LLM_CACHE_DECIMALS", 2))
+
+# part of every video cache key: bump it when what process_video caches
+# changes shape, so entries an older build left in RESULT_CACHE_DIR miss
+# instead of unpacking wrong (2: emotions joined (aus, metrics))
+VIDEO_CACHE_VERSION = 2
+
+class ResultCache:
+    '''
+    LRU cache with a TTL and a byte cap, optionally spilling to a directory.
+
+    values must be picklable; their pickled size is what counts against
+    max_bytes. with disk_dir set, entries are also written there so they
+    survive restarts and memory evictions, and the directory is trimmed to
+    max_bytes oldest-first.
+
+    validate, if given, is called on every value read back from disk; one
+    it returns False for (a pickle from an older build, say) is deleted
+    and counted as a miss.
+    '''
+
+    def __init__(self, name, max_entries=CACHE_ENTRIES, ttl=CACHE_TTL,
+                 max_bytes=CACHE_MAX_BYTES, disk_dir=None, validate=None):
+        self.name = name
+        self.validate = validate
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) / name if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.pkl"
+
+    def _disk_get(self, key):
+        path = self._disk_path(key)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink()
+                return None
+            value = pickle.loads(path.read_bytes())
+            if self.validate is not None and not self.validate(value):
+                path.unlink()
+                return None
+            return value
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def _disk_put(self, key, blob):
+        tmp = self._disk_path(key).with_suffix(".tmp")
+        try:
+            tmp.write_bytes(blob)
+            os.replace(tmp, self._disk_path(key))
+            files = sorted(self.disk_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            while files and total > self.max_bytes:
+                oldest = files.pop(0)
+                total -= oldest.stat().st_size
+                oldest.unlink()
+        except OSError as e:
+            print(f"{self.name} cache: disk write failed: {e}")
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                self._drop(key)
+            if self.disk_dir is None:
+                self.misses += 1
+                return None
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is not None:
+            self._remember(key, value, len(pickle.dumps(value)))
+        return value
+
+    def _remember(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.time() + self.ttl, size, value)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def set(self, key, value):
+        blob = pickle.dumps(value)
+        self._remember(key, value, len(blob))
+        if self.disk_dir is not None:
+            self._disk_put(key, blob)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+def video_key(digest, sampling):
+    # the same clip sampled at another rate or frame cap is a different result
+    opts = ",".join(f"{k}={v}" for k, v in sorted(sampling.items()))
+    return f"v{VIDEO_CACHE_VERSION}-{hashlib.sha256(opts.encode()).hexdigest()[:16]}-{digest}"
+
+def is_video_result(value):
+    # (avg_aus, avg_metrics, emotions), emotions None without an emotion model
+    return (isinstance(value, tuple) and len(value) == 3
+            and isinstance(value[0], dict) and isinstance(value[1], dict)
+            and (value[2] is None or isinstance(value[2], dict)))
+
+def feature_key(aus, metrics, decimals=LLM_CACHE_DECIMALS):
+    # near-identical faces share an interpretation
+    quantized = {
+        "aus": {k: round(float(v), decimals) for k, v in sorted(aus.items())},
+        "metrics": {k: round(float(v), decimals) for k, v in sorted(metrics.items())},
+    }
+    return hashlib.sha256(json.dumps(quantized, sort_keys=True).encode()).hexdigest()
+
+transcription_cache = ResultCache("transcription", disk_dir=CACHE_DIR)
+video_cache = ResultCache("video", disk_dir=CACHE_DIR, validate=is_video_result)
+interpretation_cache = ResultCache(
+    "interpretation", max_entries=LLM_CACHE_ENTRIES, ttl=LLM_CACHE_TTL, disk_dir=CACHE_DIR
+)
+
+def cache_stats():
+    return {c.name: c.stats() for c in (transcription_cache, video_cache, interpretation_cache)}
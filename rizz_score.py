@@ -0,0 +1,159 @@
+import json
+import os
+
+import numpy as np
+
+# optional JSON file overriding CALIBRATION (see fit_calibration) and/or WEIGHTS
+RIZZ_CALIBRATION = os.environ.get("RIZZ_CALIBRATION")
+
+SCORE_FEATURES = (
+    "AU06", "AU12", "AU25", "AU45",
+    "eye_openness", "smile_symmetry", "brow_symmetry", "mouth_openness",
+    "tension_index", "confidence_index", "head_tilt",
+    "pitch_std_hz", "energy_cv", "voiced_ratio",
+)
+
+# (center, scale) per feature: a typical value and how far counts as "a lot".
+# features are z-scored against these and clipped to +-3 before weighting.
+# head_tilt is taken as absolute degrees; energy_cv is prosody energy_std / rms
+CALIBRATION = {
+    "AU06": (0.1, 0.15),
+    "AU12": (0.75, 0.08),
+    "AU25": (0.03, 0.04),
+    "AU45": (0.0, 0.2),
+    "eye_openness": (0.3, 0.08),
+    "smile_symmetry": (0.9, 0.06),
+    "brow_symmetry": (0.9, 0.06),
+    "mouth_openness": (0.03, 0.03),
+    "tension_index": (0.1, 0.1),
+    "confidence_index": (0.6, 0.1),
+    "head_tilt": (5.0, 5.0),
+    "pitch_std_hz": (25.0, 15.0),
+    "energy_cv": (0.8, 0.3),
+    "voiced_ratio": (0.4, 0.2),
+}
+
+# sub-score -> weight per z-scored feature; a sub-score is 100 * sigmoid(w . z)
+WEIGHTS = {
+    "confidence": {
+        "confidence_index": 1.0, "eye_openness": 0.3, "head_tilt": -0.3,
+        "tension_index": -0.5, "voiced_ratio": 0.4, "pitch_std_hz": 0.2,
+    },
+    "warmth": {
+        "AU12": 0.8, "AU06": 0.6, "smile_symmetry": 0.4, "brow_symmetry": 0.2,
+        "tension_index": -0.3,
+    },
+    "energy": {
+        "mouth_openness": 0.5, "AU25": 0.3, "eye_openness": 0.4, "pitch_std_hz": 0.6,
+        "energy_cv": 0.5, "voiced_ratio": 0.3,
+    },
+    "composure": {
+        "tension_index": -0.8, "smile_symmetry": 0.3, "brow_symmetry": 0.4,
+        "head_tilt": -0.3, "AU45": -0.4, "energy_cv": -0.2,
+    },
+}
+
+# overall rizz is this blend of the sub-scores
+BLEND = {"confidence": 0.3, "warmth": 0.3, "energy": 0.2, "composure": 0.2}
+
+# first matching row wins: (label, {sub-score or "rizz": (low, high)})
+LABELS = (
+    ("god-tier rizz", {"rizz": (80, 100)}),
+    ("cringe rizz", {"rizz": (0, 30)}),
+    ("golden-retriever rizz", {"warmth": (65, 100), "energy": (60, 100)}),
+    ("sigma rizz", {"confidence": (60, 100), "composure": (60, 100), "warmth": (0, 50)}),
+    ("awkward rizz", {"composure": (0, 40)}),
+    ("soft rizz", {"warmth": (55, 100)}),
+    ("lowkey rizz", {}),
+)
+
+class RizzScorer:
+    '''
+    local, deterministic scoring: a calibrated linear model over the AU,
+    metric and prosody features, then a first-match label table. no model
+    files or network; one call is a few small numpy ops.
+    '''
+
+    def __init__(self, calibration=CALIBRATION, weights=WEIGHTS, blend=BLEND, labels=LABELS):
+        self.center = np.array([calibration[name][0] for name in SCORE_FEATURES])
+        self.scale = np.array([calibration[name][1] for name in SCORE_FEATURES])
+        self.sub_scores = tuple(weights)
+        self.weights = np.array([
+            [weights[sub].get(name, 0.0) for name in SCORE_FEATURES] for sub in self.sub_scores
+        ])
+        self.blend = np.array([blend[sub] for sub in self.sub_scores])
+        self.blend /= self.blend.sum()
+        self.labels = labels
+
+    def features(self, aus, metrics, prosody=None):
+        # -> SCORE_FEATURES vector; missing prosody is nan and scores as typical
+        values = {**aus, **metrics}
+        values["head_tilt"] = abs(values["head_tilt"])
+        prosody = prosody or {}
+        rms = prosody.get("rms")
+        values["energy_cv"] = prosody["energy_std"] / rms if rms else None
+        values["pitch_std_hz"] = prosody.get("pitch_std_hz")
+        values["voiced_ratio"] = prosody.get("voiced_ratio")
+        return np.array([np.nan if values.get(name) is None else values[name] for name in SCORE_FEATURES],
+                        dtype=np.float64)
+
+    def score_batch(self, features):
+        '''
+        features: (n, len(SCORE_FEATURES)) rows from features()
+        returns (n, len(sub_scores) + 1) scores in 0-100, overall rizz last
+        '''
+        z = np.clip((np.asarray(features, dtype=np.float64) - self.center) / self.scale, -3, 3)
+        z = np.nan_to_num(z, nan=0.0)
+        subs = 100.0 / (1.0 + np.exp(-(z @ self.weights.T)))
+        return np.concatenate([subs, (subs @ self.blend)[:, None]], axis=1)
+
+    def label(self, scores):
+        for name, bounds in self.labels:
+            if all(low <= scores[key] <= high for key, (low, high) in bounds.items()):
+                return name
+        return self.labels[-1][0]
+
+    def score(self, aus, metrics, prosody=None):
+        row = self.score_batch(self.features(aus, metrics, prosody)[None])[0]
+        scores = {sub: round(float(v), 1) for sub, v in zip(self.sub_scores, row)}
+        scores["rizz"] = round(float(row[-1]), 1)
+        scores["label"] = self.label(scores)
+        return scores
+
+def fit_calibration(features):
+    '''
+    CALIBRATION from observed feature rows (features() output, e.g. logged
+    from real sessions): median as the center, IQR/1.35 (a robust std) as
+    the scale. nan entries are ignored and features never observed (e.g. no
+    prosody) are left out, so they keep their defaults; constant features
+    get a scale of 1.
+    '''
+    features = np.asarray(features, dtype=np.float64)
+    observed = np.isfinite(features).any(axis=0)
+    names = [name for name, seen in zip(SCORE_FEATURES, observed) if seen]
+    features = features[:, observed]
+    center = np.nanmedian(features, axis=0)
+    q25, q75 = np.nanpercentile(features, [25, 75], axis=0)
+    scale = (q75 - q25) / 1.35
+    scale = np.where(scale > 0, scale, 1.0)
+    return {name: (float(c), float(s)) for name, c, s in zip(names, center, scale)}
+
+def load_scorer(path=RIZZ_CALIBRATION):
+    if not path:
+        return RizzScorer()
+    with open(path) as f:
+        overrides = json.load(f)
+    calibration = {**CALIBRATION, **{k: tuple(v) for k, v in overrides.get("calibration", {}).items()}}
+    return RizzScorer(calibration, overrides.get("weights", WEIGHTS))
+
+def describe(scores):
+    # a one-line reading of the scores, for when there's no LLM narrative
+    return (
+        f"{scores['label']} ({scores['rizz']:.0f}/100): confidence {scores['confidence']:.0f}, "
+        f"warmth {scores['warmth']:.0f}, energy {scores['energy']:.0f}, composure {scores['composure']:.0f}."
+    )
+
+scorer = load_scorer()
+
+def rizz_score(aus, metrics, prosody=None):
+    return scorer.score(aus, metrics, prosody)
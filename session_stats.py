@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+
+# recent rows kept for percentiles; everything else is O(k) running state
+DEFAULT_WINDOW = 1024
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+class SessionAggregator:
+    '''
+    running per-feature statistics over a stream of feature rows.
+
+    mean/variance use Welford's update (Chan's merge for batches), min/max
+    are running, and percentiles come from a preallocated ring buffer of the
+    last `window` rows -- exact until the session outgrows the window. memory
+    is fixed at construction however long the session runs.
+
+    update() and snapshot() take a lock, so a capture loop can feed it while
+    a UI or websocket handler reads current values from another thread.
+    '''
+
+    def __init__(self, names, window=DEFAULT_WINDOW, percentiles=DEFAULT_PERCENTILES):
+        self.names = list(names)
+        self.percentiles = tuple(percentiles)
+        k = len(self.names)
+        self.count = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self._mean = np.zeros(k)
+        self._m2 = np.zeros(k)
+        self._min = np.full(k, np.inf)
+        self._max = np.full(k, -np.inf)
+        self._recent = np.empty((window, k))
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def _push_recent(self, rows):
+        window = len(self._recent)
+        rows = rows[-window:]
+        end = self._cursor + len(rows)
+        if end <= window:
+            self._recent[self._cursor:end] = rows
+        else:
+            split = window - self._cursor
+            self._recent[self._cursor:] = rows[:split]
+            self._recent[: end - window] = rows[split:]
+        self._cursor = end % window
+
+    def _touch(self, timestamp):
+        if timestamp is None:
+            return
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+
+    def update(self, row, timestamp=None):
+        '''add one feature row (len(names) values, in names order)'''
+        row = np.asarray(row, dtype=np.float64)
+        with self._lock:
+            self.count += 1
+            delta = row - self._mean
+            self._mean += delta / self.count
+            self._m2 += delta * (row - self._mean)
+            np.minimum(self._min, row, out=self._min)
+            np.maximum(self._max, row, out=self._max)
+            self._push_recent(row[None])
+            self._touch(timestamp)
+
+    def update_batch(self, rows, timestamp=None):
+        '''add an (n, len(names)) block of rows at once'''
+        rows = np.asarray(rows, dtype=np.float64)
+        n = len(rows)
+        if n == 0:
+            return
+        batch_mean = rows.mean(axis=0)
+        batch_m2 = ((rows - batch_mean) ** 2).sum(axis=0)
+        with self._lock:
+            total = self.count + n
+            delta = batch_mean - self._mean
+            self._mean += delta * (n / total)
+            self._m2 += batch_m2 + delta ** 2 * (self.count * n / total)
+            self.count = total
+            np.minimum(self._min, rows.min(axis=0), out=self._min)
+            np.maximum(self._max, rows.max(axis=0), out=self._max)
+            self._push_recent(rows)
+            self._touch(timestamp)
+
+    @property
+    def mean(self):
+        with self._lock:
+            return self._mean.copy()
+
+    def means(self):
+        '''{name: mean}, empty before the first row like avg_dict_list([])'''
+        with self._lock:
+            if self.count == 0:
+                return {}
+            return {name: float(v) for name, v in zip(self.names, self._mean)}
+
+    def snapshot(self):
+        '''
+        current statistics as plain floats, safe to call mid-session:
+        {count, duration, mean, std, min, max, p10, p50, ...} with each
+        statistic a {name: value} dict.
+        '''
+        with self._lock:
+            count = self.count
+            snap = {"count": count}
+            if self.first_timestamp is not None:
+                snap["duration"] = float(self.last_timestamp - self.first_timestamp)
+            if count == 0:
+                return snap
+            stats = {
+                "mean": self._mean.copy(),
+                "std": np.sqrt(self._m2 / count),
+                "min": self._min.copy(),
+                "max": self._max.copy(),
+            }
+            recent = self._recent[: min(count, len(self._recent))].copy()
+
+        if self.percentiles:
+            for p, values in zip(self.percentiles, np.percentile(recent, self.percentiles, axis=0)):
+                stats[f"p{p:g}"] = values
+        for key, values in stats.items():
+            snap[key] = {name: float(v) for name, v in zip(self.names, values)}
+        return snap
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# "background" loads models on a thread after boot, "eager" blocks boot on
+# them like before, "off" leaves everything to the first request that needs it
+WARMUP = os.environ.get("WARMUP", "background")
+# a failed load is retried this many times, backing off from WARMUP_BACKOFF
+# seconds (doubling, at most a minute); after that the process exits so the
+# platform restarts it, instead of it answering /ready with 503 for good
+WARMUP_RETRIES = int(os.environ.get("WARMUP_RETRIES", 4))
+WARMUP_BACKOFF = float(os.environ.get("WARMUP_BACKOFF", 5))
+
+_started = time.perf_counter()
+_timings = {}
+_lock = threading.Lock()
+_ready = threading.Event()
+_warmup_error = None
+
+@contextmanager
+def timed(label):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        with _lock:
+            _timings[label] = round(elapsed, 3)
+        print(f"[startup] {label}: {elapsed:.2f}s")
+
+def _warm_up(pools, retries=WARMUP_RETRIES, backoff=WARMUP_BACKOFF):
+    global _warmup_error
+    for attempt in range(retries + 1):
+        try:
+            for pool in pools:
+                if pool.stats()["created"] > 0:
+                    continue
+                with timed(f"load {pool.name}"):
+                    pool.prefill(1)
+            _warmup_error = None
+            break
+        except Exception as e:
+            _warmup_error = f"{e} (attempt {attempt + 1} of {retries + 1})"
+            print(f"[startup] warm-up failed: {_warmup_error}")
+            if attempt < retries:
+                time.sleep(min(backoff * 2 ** attempt, 60))
+    else:
+        print("[startup] giving up on warm-up; exiting so the process is restarted", flush=True)
+        os._exit(1)
+    with _lock:
+        _timings["ready_after"] = round(time.perf_counter() - _started, 3)
+    _ready.set()
+
+def start_warmup(pools, mode=WARMUP):
+    '''
+    models are handed out by lazy pools, so nothing here is required for
+    correctness; warming only moves the load off the first request.
+    '''
+    if mode == "off":
+        _ready.set()
+    elif mode == "eager":
+        _warm_up(pools)
+    else:
+        threading.Thread(target=_warm_up, args=(pools,), name="warmup", daemon=True).start()
+
+def readiness(pools):
+    '''(ready, payload) for a readiness probe; liveness is just "process answers"'''
+    with _lock:
+        timings = dict(_timings)
+    payload = {
+        "ready": _ready.is_set() and _warmup_error is None,
+        "models": {pool.name: pool.stats()["created"] > 0 for pool in pools},
+        "startup_seconds": timings,
+    }
+    if _warmup_error:
+        payload["error"] = _warmup_error
+    return payload["ready"], payload
@@ -0,0 +1,66 @@
+'''
+sampling on a stream whose timestamps are rounded to whole milliseconds,
+as WebM's are: the grab and seek paths must land on the same frames
+'''
+import math
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_sampler import FrameSampler
+
+class MillisecondCapture:
+    '''a cv2.VideoCapture stand-in: n_frames at fps, timestamps rounded to 1 ms'''
+
+    def __init__(self, n_frames, fps):
+        self.n_frames = n_frames
+        self.fps = fps
+        self.pos = 0  # index of the next frame grab() returns
+        self.current = None
+
+    def _ms(self, index):
+        return float(round(index * 1000 / self.fps))
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.n_frames
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self._ms(self.current) if self.current is not None else 0.0
+        return 0.0
+
+    def set(self, prop, value):
+        # seek to the first frame at or after the requested time
+        self.pos = next((i for i in range(self.n_frames) if self._ms(i) >= value), self.n_frames)
+        return True
+
+    def grab(self):
+        if self.pos >= self.n_frames:
+            return False
+        self.current, self.pos = self.pos, self.pos + 1
+        return True
+
+    def retrieve(self):
+        return True, self.current
+
+@pytest.mark.parametrize("mode", ["grab", "seek"])
+def test_samples_every_fifth_frame_of_30fps(mode):
+    sampler = FrameSampler(MillisecondCapture(60, 30.0), target_fps=6, max_frames=0, mode=mode)
+    indices = [index for index, _, _ in sampler]
+    assert indices == list(range(0, 60, 5))
+
+def test_grab_and_seek_agree_at_odd_rates():
+    for fps, target in ((29.97, 6), (24, 5), (30, 7)):
+        grab = [i for i, _, _ in FrameSampler(MillisecondCapture(90, fps), target, 0, "grab")]
+        seek = [i for i, _, _ in FrameSampler(MillisecondCapture(90, fps), target, 0, "seek")]
+        assert grab == seek, (fps, target)
+        gaps = {b - a for a, b in zip(grab, grab[1:])}
+        assert max(gaps) - min(gaps) <= 1
+        assert min(gaps) >= math.floor(fps / target)
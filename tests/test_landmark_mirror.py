@@ -0,0 +1,78 @@
+'''
+a landmarks upload (raw camera orientation, as landmarks.js sends it) must
+score like the video upload of the same face, which the server mirrors
+before its face mesh
+'''
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+cv2 = pytest.importorskip("cv2")
+
+from feature_engine import average_landmark_payload
+from landmark_codec import MIRROR_PAIRS, N_LANDMARKS, encode_landmarks, mirror_landmarks
+from workloads import face_template, synthetic_landmarks
+
+WIDTH, HEIGHT, FPS, SECONDS = 320, 240, 30, 2
+
+class EyeCornerMesh:
+    '''
+    stands in for mediapipe: finds the two white eyes workloads.draw_face
+    paints and labels their outer corners 33 (image-left) and 263
+    (image-right), as the real mesh does for whatever face it is shown
+    '''
+
+    def __init__(self):
+        self.template = face_template()
+
+    @staticmethod
+    def _corner(mask, column):
+        ys = np.nonzero(mask[:, column])[0]
+        return column, ys.mean()
+
+    def process(self, rgb):
+        h, w, _ = rgb.shape
+        white = (rgb > 230).all(axis=2).astype(np.uint8)
+        n, labels, stats, centroids = cv2.connectedComponentsWithStats(white)
+        blobs = sorted(range(1, n), key=lambda i: stats[i, cv2.CC_STAT_AREA], reverse=True)[:2]
+        if len(blobs) < 2:
+            return types.SimpleNamespace(multi_face_landmarks=None)
+        left, right = sorted(blobs, key=lambda i: centroids[i, 0])
+        points = self.template.copy()
+        x, y = self._corner(labels == left, stats[left, cv2.CC_STAT_LEFT])
+        points[33, :2] = x / w, y / h
+        x, y = self._corner(labels == right, stats[right, cv2.CC_STAT_LEFT] + stats[right, cv2.CC_STAT_WIDTH] - 1)
+        points[263, :2] = x / w, y / h
+        landmark = [types.SimpleNamespace(x=p[0], y=p[1], z=p[2]) for p in points]
+        return types.SimpleNamespace(multi_face_landmarks=[types.SimpleNamespace(landmark=landmark)])
+
+def test_mirror_swaps_pairs_and_flips_x():
+    points = np.random.default_rng(0).uniform(size=(N_LANDMARKS, 3)).astype(np.float32)
+    mirrored = mirror_landmarks(points)
+    for a, b in MIRROR_PAIRS:
+        assert mirrored[a, 0] == pytest.approx(1 - points[b, 0])
+        assert mirrored[b, 1] == points[a, 1]
+    assert mirrored[1, 0] == pytest.approx(1 - points[1, 0])
+    np.testing.assert_allclose(mirror_landmarks(mirrored), points, atol=1e-6)
+
+def test_landmarks_upload_matches_video_head_tilt(tmp_path):
+    pytest.importorskip("av")
+    from video_pipeline import run_video_pipeline
+    from workloads import write_webm
+
+    video = write_webm(tmp_path / "face.webm", SECONDS, WIDTH, HEIGHT, FPS, audio=False)
+    _, video_metrics, _, stats = run_video_pipeline(str(video), EyeCornerMesh())
+    assert stats["frames_with_face"] > 0
+
+    frames = synthetic_landmarks(SECONDS * FPS, FPS)
+    payload = b"".join(encode_landmarks(p, WIDTH, HEIGHT, i / FPS) for i, p in enumerate(frames))
+    _, landmark_metrics = average_landmark_payload(payload)
+
+    assert landmark_metrics["head_tilt"] == pytest.approx(video_metrics["head_tilt"], abs=1.0)
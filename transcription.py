@@ -1,6 +1,75 @@
-import whisper
-model = whisper.load_model("small")
+import os
+from abc import ABC, abstractmethod
 
-def transcribe(audio_path):
-    result = model.transcribe(audio_path)
-    return result["text"]
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "tiny.en")
+# "whisper" (openai-whisper on CPU torch) or "faster-whisper" (CTranslate2)
+TRANSCRIBE_BACKEND = os.environ.get("TRANSCRIBE_BACKEND", "whisper")
+# CTranslate2 weight type; int8 is the fast CPU choice
+CT2_COMPUTE_TYPE = os.environ.get("CT2_COMPUTE_TYPE", "int8")
+CT2_THREADS = int(os.environ.get("CT2_THREADS", 0))
+
+class TranscriptionBackend(ABC):
+    '''
+    one speech-to-text engine. transcribe() takes a file path or a 16 kHz
+    mono float32 array and returns the stripped text.
+    '''
+
+    name = None
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        self.model_name = model_name
+
+    @abstractmethod
+    def transcribe(self, audio):
+        '''text spoken in `audio` (a path or a float32 array)'''
+
+class WhisperTorchBackend(TranscriptionBackend):
+    name = "whisper"
+
+    def __init__(self, model_name=WHISPER_MODEL):
+        super().__init__(model_name)
+        import whisper
+        self.model = whisper.load_model(model_name, device="cpu")
+
+    def transcribe(self, audio):
+        result = self.model.transcribe(audio, fp16=False, without_timestamps=True)
+        return result["text"].strip()
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = "faster-whisper"
+
+    def __init__(self, model_name=WHISPER_MODEL, compute_type=CT2_COMPUTE_TYPE, cpu_threads=CT2_THREADS):
+        super().__init__(model_name)
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("TRANSCRIBE_BACKEND=faster-whisper needs `pip install faster-whisper`")
+        self.model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def transcribe(self, audio):
+        # greedy decoding, same as whisper's transcribe default on CPU
+        segments, _ = self.model.transcribe(audio, beam_size=1, without_timestamps=True)
+        return "".join(segment.text for segment in segments).strip()
+
+BACKENDS = {
+    WhisperTorchBackend.name: WhisperTorchBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+def load_backend(name=TRANSCRIBE_BACKEND, model_name=WHISPER_MODEL):
+    if name not in BACKENDS:
+        raise ValueError(f"unknown transcription backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](model_name)
+
+def backend_id(name=TRANSCRIBE_BACKEND, model_name=WHISPER_MODEL):
+    # engine + weights, e.g. for cache keys; doesn't load anything
+    return f"{name}-{model_name}"
+
+_default = None
+
+def transcribe(audio):
+    # module-level convenience, loads the configured backend on first use
+    global _default
+    if _default is None:
+        _default = load_backend()
+    return _default.transcribe(audio)
@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+MAX_VIDEO_BYTES = int(os.environ.get("UPLOAD_MAX_VIDEO_BYTES", 50 * 1024 * 1024))
+MAX_AUDIO_BYTES = int(os.environ.get("UPLOAD_MAX_AUDIO_BYTES", 10 * 1024 * 1024))
+# landmark_codec records are ~2.8 KB a frame; 4 MB is well over a minute at 10 fps
+MAX_LANDMARK_BYTES = int(os.environ.get("UPLOAD_MAX_LANDMARK_BYTES", 4 * 1024 * 1024))
+# whole multipart body, checked against Content-Length before anything is read
+MAX_REQUEST_BYTES = MAX_VIDEO_BYTES + MAX_AUDIO_BYTES + 64 * 1024
+CHUNK_SIZE = 256 * 1024
+
+class UploadTooLarge(Exception):
+    def __init__(self, field, limit):
+        super().__init__(f"{field} upload exceeds {limit / (1024 * 1024):g} MB limit")
+        self.field = field
+        self.limit = limit
+
+class _Spool:
+    '''
+    a temp file that counts what is written to it and raises UploadTooLarge
+    once max_bytes is crossed; leaving the with block on any error deletes it
+    '''
+
+    def __init__(self, field, max_bytes, suffix):
+        self.field = field
+        self.max_bytes = max_bytes
+        fd, self.path = tempfile.mkstemp(suffix=suffix)
+        self.file = os.fdopen(fd, "wb")
+        self.total = 0
+
+    def write(self, chunk):
+        self.total += len(chunk)
+        if self.total > self.max_bytes:
+            raise UploadTooLarge(self.field, self.max_bytes)
+        self.file.write(chunk)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is not None:
+            os.unlink(self.path)
+
+def save_stream(read, field, max_bytes, suffix=".webm"):
+    '''
+    copy a file-like upload to a temp file chunk by chunk, so memory stays at
+    one chunk whatever the upload size. returns the temp path.
+
+    the framework has already parsed (and spooled) the multipart body by the
+    time this runs, so max_bytes only bounds what we keep per field; bodies
+    that are too big are turned away earlier, from Content-Length, by
+    MAX_REQUEST_BYTES (Flask's MAX_CONTENT_LENGTH, api.py's middleware).
+    '''
+    with _Spool(field, max_bytes, suffix) as spool:
+        for chunk in iter(lambda: read(CHUNK_SIZE), b""):
+            spool.write(chunk)
+    return spool.path
+
+async def save_upload(upload, field, max_bytes, suffix=".webm"):
+    '''save_stream for starlette UploadFile'''
+    with _Spool(field, max_bytes, suffix) as spool:
+        while chunk := await upload.read(CHUNK_SIZE):
+            spool.write(chunk)
+    return spool.path
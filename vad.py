@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+
+from audio_demux import WHISPER_SAMPLE_RATE
+
+NO_SPEECH = "No speech detected."
+
+# 30 ms frames, the usual VAD resolution
+FRAME_SECONDS = 0.03
+# absolute floor: audio_analyzer calls anything under 0.05 "Quiet", speech
+# from a laptop mic sits well above 0.01
+VAD_MIN_RMS = float(os.environ.get("VAD_MIN_RMS", 0.01))
+# a frame is voiced when it is this many times louder than the noise floor
+VAD_FLOOR_RATIO = float(os.environ.get("VAD_FLOOR_RATIO", 3.0))
+# keep this much audio around each voiced run so word edges aren't clipped
+VAD_PAD_SECONDS = float(os.environ.get("VAD_PAD_SECONDS", 0.2))
+# voiced runs shorter than this are clicks / bumps, not speech
+VAD_MIN_SPEECH_SECONDS = float(os.environ.get("VAD_MIN_SPEECH_SECONDS", 0.25))
+
+def frame_rms(audio, frame_length):
+    '''rms of each non-overlapping frame; the tail that doesn't fill a frame is dropped'''
+    n = len(audio) // frame_length
+    frames = audio[: n * frame_length].reshape(n, frame_length).astype(np.float64)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+def voiced_mask(audio, sr=WHISPER_SAMPLE_RATE):
+    '''boolean per FRAME_SECONDS frame, True where the frame looks like speech'''
+    frame_length = max(1, int(sr * FRAME_SECONDS))
+    rms = frame_rms(audio, frame_length)
+    if rms.size == 0:
+        return rms.astype(bool), frame_length
+    # the quietest tenth of the clip is a decent noise floor estimate; capped
+    # at half the peak so a clip that's speech from end to end still passes
+    floor = np.percentile(rms, 10)
+    threshold = max(VAD_MIN_RMS, min(floor * VAD_FLOOR_RATIO, 0.5 * rms.max()))
+    return rms > threshold, frame_length
+
+def speech_segments(audio, sr=WHISPER_SAMPLE_RATE):
+    '''(start, end) sample ranges of padded voiced runs, merged where they overlap'''
+    mask, frame_length = voiced_mask(audio, sr)
+    if not mask.any():
+        return []
+    # run boundaries from the mask's edges
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    starts, ends = edges[::2], edges[1::2]
+    min_frames = VAD_MIN_SPEECH_SECONDS / FRAME_SECONDS
+    pad = int(VAD_PAD_SECONDS * sr)
+
+    segments = []
+    for start, end in zip(starts, ends):
+        if end - start < min_frames:
+            continue
+        lo = max(0, start * frame_length - pad)
+        hi = min(len(audio), end * frame_length + pad)
+        if segments and lo <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], hi)
+        else:
+            segments.append((lo, hi))
+    return segments
+
+def trim_silence(audio, sr=WHISPER_SAMPLE_RATE):
+    '''
+    drop leading/trailing silence and the gaps between voiced segments.
+    returns the concatenated speech as float32, or None when nothing is
+    voiced so the caller can skip transcription entirely.
+    '''
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    segments = speech_segments(audio, sr)
+    if not segments:
+        return None
+    if len(segments) == 1:
+        lo, hi = segments[0]
+        return audio[lo:hi]
+    return np.concatenate([audio[lo:hi] for lo, hi in segments])
@@ -0,0 +1,222 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from au_feature import landmarks_to_array
+from emotion import EmotionBatcher, crop_face
+from feature_engine import FEATURE_NAMES, compute_features_batch, split_features
+from frame_sampler import DEFAULT_MAX_FRAMES, DEFAULT_TARGET_FPS, FrameSampler
+from session_stats import SessionAggregator
+
+# landmark rows are turned into features this many at a time, so the
+# vectorized engine still gets batches without holding the whole clip
+FEATURE_CHUNK = 16
+
+# how the servers sample an uploaded clip; the video result cache keys on it
+VIDEO_SAMPLING = {"target_fps": DEFAULT_TARGET_FPS, "max_frames": DEFAULT_MAX_FRAMES, "sample_mode": "grab"}
+
+# a stage that finds this on its input queue forwards it and exits
+_DONE = object()
+
+class PipelineCancelled(Exception):
+    pass
+
+class StageTimings:
+    '''per-stage busy time, so we can see which stage bounds the pipeline'''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seconds = {}
+        self.counts = {}
+
+    def add(self, stage, seconds, count=1):
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.counts[stage] = self.counts.get(stage, 0) + count
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                stage: {"seconds": round(self.seconds[stage], 4), "items": self.counts[stage]}
+                for stage in self.seconds
+            }
+
+def _put(q, item, stop):
+    # blocking put that gives up once the pipeline is being torn down
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def _decode_stage(video_path, out_q, stop, timings, errors, meta, sampler_opts):
+    cap = cv2.VideoCapture(video_path)
+    try:
+        meta["opened"] = cap.isOpened()
+        if not meta["opened"]:
+            return
+        sampler = FrameSampler(cap, **sampler_opts)
+        frames = iter(sampler)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            item = next(frames, None)
+            if item is None:
+                break
+            _, _, frame = item
+            frame = cv2.flip(frame, 1)
+            h, w, _ = frame.shape
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            timings.add("decode", time.perf_counter() - t0)
+            if not _put(out_q, (rgb, w, h), stop):
+                break
+        meta["frames_grabbed"] = sampler.frames_grabbed
+        meta["frames_sampled"] = sampler.frames_retrieved
+    except Exception as e:
+        errors.append(e)
+    finally:
+        cap.release()
+        _put(out_q, _DONE, stop)
+
+def _landmark_stage(face_mesh, in_q, out_q, stop, timings, errors, crop_faces):
+    try:
+        while not stop.is_set():
+            item = _get(in_q, stop)
+            if item is _DONE:
+                break
+            rgb, w, h = item
+            t0 = time.perf_counter()
+            results = face_mesh.process(rgb)
+            timings.add("landmarks", time.perf_counter() - t0)
+            if results.multi_face_landmarks:
+                points = landmarks_to_array(results.multi_face_landmarks[0].landmark)
+                # crop while the frame is still here; only the small crop goes downstream
+                crop = crop_face(rgb, points) if crop_faces else None
+                if not _put(out_q, (points, w, h, crop), stop):
+                    break
+    except Exception as e:
+        errors.append(e)
+    finally:
+        _put(out_q, _DONE, stop)
+
+def run_video_pipeline(video_path, face_mesh, target_fps=DEFAULT_TARGET_FPS,
+                       max_frames=DEFAULT_MAX_FRAMES, sample_mode="grab", queue_size=2,
+                       cancel=None, emotion_session=None, aggregator=None):
+    '''
+    decode -> face mesh -> features, each stage on its own thread joined by
+    bounded queues, so decode of frame N+1 overlaps MediaPipe on frame N.
+    with an emotion_session, face crops are classified in batches on the
+    feature stage.
+    returns (avg_aus, avg_metrics, emotions, stats); avg_* are None if no face
+    was found, emotions is None without a session.
+    setting the optional `cancel` event tears the stages down and raises
+    PipelineCancelled.
+    features go into `aggregator` (a SessionAggregator over FEATURE_NAMES,
+    created if not given) as they arrive; pass one in to snapshot() it
+    while the clip is still being processed.
+    '''
+    frame_q = queue.Queue(maxsize=queue_size)
+    landmark_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    timings = StageTimings()
+    errors = []
+    meta = {"opened": False, "frames_grabbed": 0, "frames_sampled": 0}
+    sampler_opts = {"target_fps": target_fps, "max_frames": max_frames, "mode": sample_mode}
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(
+            target=_decode_stage,
+            args=(video_path, frame_q, stop, timings, errors, meta, sampler_opts),
+            daemon=True,
+        ),
+        threading.Thread(
+            target=_landmark_stage,
+            args=(face_mesh, frame_q, landmark_q, stop, timings, errors, emotion_session is not None),
+            daemon=True,
+        ),
+    ]
+    for t in threads:
+        t.start()
+
+    if aggregator is None:
+        aggregator = SessionAggregator(FEATURE_NAMES)
+
+    def flush_features():
+        t0 = time.perf_counter()
+        aggregator.update_batch(compute_features_batch(
+            np.stack(points),
+            np.array(widths, dtype=np.float64),
+            np.array(heights, dtype=np.float64),
+        ))
+        timings.add("features", time.perf_counter() - t0, len(points))
+        points.clear()
+        widths.clear()
+        heights.clear()
+
+    # feature stage runs on the calling thread
+    points, widths, heights = [], [], []
+    frames_with_face = 0
+    batcher = EmotionBatcher(emotion_session) if emotion_session is not None else None
+    try:
+        while True:
+            try:
+                item = landmark_q.get(timeout=0.1)
+            except queue.Empty:
+                if cancel is not None and cancel.is_set():
+                    raise PipelineCancelled()
+                continue
+            if item is _DONE:
+                break
+            frame_points, w, h, crop = item
+            points.append(frame_points)
+            widths.append(w)
+            heights.append(h)
+            frames_with_face += 1
+            if len(points) == FEATURE_CHUNK:
+                flush_features()
+            if batcher is not None and crop is not None:
+                t0 = time.perf_counter()
+                batcher.add(crop)
+                timings.add("emotion", time.perf_counter() - t0)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+
+    if points:
+        flush_features()
+    avg_aus, avg_metrics = None, None
+    if aggregator.count:
+        avg_aus, avg_metrics = split_features(aggregator.mean)
+
+    emotions = None
+    if batcher is not None:
+        t0 = time.perf_counter()
+        emotions = batcher.summary()
+        timings.add("emotion", time.perf_counter() - t0, 0)
+
+    stats = {
+        "opened": meta["opened"],
+        "frames_grabbed": meta["frames_grabbed"],
+        "frames_sampled": meta["frames_sampled"],
+        "frames_with_face": frames_with_face,
+        "wall_seconds": round(time.perf_counter() - start, 4),
+        "stages": timings.as_dict(),
+    }
+    return avg_aus, avg_metrics, emotions, stats
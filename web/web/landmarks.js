@@ -0,0 +1,67 @@
+// Browser-side face mesh. When it loads, the client uploads a few KB of
+// landmarks instead of the webm and the server skips decode + face mesh.
+// Records match landmark_codec.py: float32 timestamp, uint16 width,
+// uint16 height, then 478 x (x, y, z) as float16, little-endian.
+const VISION_BUNDLE = 'https://cdn.jsdelivr.net/npm/@mediapipe/tasks-vision@0.10.8';
+const FACE_MODEL = 'https://storage.googleapis.com/mediapipe-models/face_landmarker/face_landmarker/float16/1/face_landmarker.task';
+const N_LANDMARKS = 478;
+const LANDMARK_RECORD_BYTES = 8 + N_LANDMARKS * 3 * 2;
+// same as the server's default sampling rate for uploaded video
+const LANDMARK_FPS = 6;
+
+let faceLandmarker = null;
+
+async function initFaceLandmarker() {
+    try {
+        const vision = await import(`${VISION_BUNDLE}/vision_bundle.mjs`);
+        const fileset = await vision.FilesetResolver.forVisionTasks(`${VISION_BUNDLE}/wasm`);
+        faceLandmarker = await vision.FaceLandmarker.createFromOptions(fileset, {
+            baseOptions: { modelAssetPath: FACE_MODEL },
+            runningMode: 'VIDEO',
+            numFaces: 1
+        });
+    } catch (error) {
+        // no wasm/CDN access: keep uploading video
+        console.warn('Browser face mesh unavailable, uploading video instead:', error);
+        faceLandmarker = null;
+    }
+}
+
+// float32 -> IEEE half bits (round to nearest, enough for normalized coords)
+const halfScratch = new DataView(new ArrayBuffer(4));
+function toHalf(value) {
+    halfScratch.setFloat32(0, value);
+    const bits = halfScratch.getUint32(0);
+    const sign = (bits >>> 16) & 0x8000;
+    const exponent = ((bits >>> 23) & 0xff) - 127 + 15;
+    const mantissa = bits & 0x7fffff;
+    if (exponent <= 0) {
+        return sign;
+    }
+    if (exponent >= 31) {
+        return sign | 0x7c00;
+    }
+    // rounding can carry into the exponent, hence + rather than |
+    return sign | ((exponent << 10) + ((mantissa + 0x1000) >>> 13));
+}
+
+// One frame's landmarks as a landmark_codec record, or null without a face
+function landmarkRecord(video, seconds) {
+    const result = faceLandmarker.detectForVideo(video, performance.now());
+    const points = result.faceLandmarks && result.faceLandmarks[0];
+    if (!points || points.length < N_LANDMARKS) {
+        return null;
+    }
+    const record = new DataView(new ArrayBuffer(LANDMARK_RECORD_BYTES));
+    record.setFloat32(0, seconds, true);
+    record.setUint16(4, video.videoWidth, true);
+    record.setUint16(6, video.videoHeight, true);
+    for (let i = 0; i < N_LANDMARKS; i++) {
+        const offset = 8 + i * 6;
+        // raw camera orientation; the server mirrors (and relabels) the points
+        record.setUint16(offset, toHalf(points[i].x), true);
+        record.setUint16(offset + 2, toHalf(points[i].y), true);
+        record.setUint16(offset + 4, toHalf(points[i].z), true);
+    }
+    return record.buffer;
+}
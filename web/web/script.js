@@ -2,6 +2,8 @@ let videoStream = null;
 let mediaRecorder = null;
 let videoChunks = [];
 let audioChunks = [];
+let landmarkRecords = [];
+let landmarkTimer = null;
 let recordingStartTime = null;
 
 const videoPreview = document.getElementById('videoPreview');
@@ -22,6 +24,8 @@ async function initCamera() {
         videoPreview.srcObject = videoStream;
         status.textContent = 'camera ready! click to begin your romantic letter';
         status.className = 'status ready';
+        // loads in the background; until it's ready we upload video
+        initFaceLandmarker();
     } catch (error) {
         console.error('Error accessing camera/microphone:', error);
         status.textContent = 'oops! can\'t access camera/microphone. please allow permissions';
@@ -34,39 +38,62 @@ async function startRecording() {
     try {
         videoChunks = [];
         audioChunks = [];
+        landmarkRecords = [];
         
-        // Create separate tracks for video and audio
         const videoTrack = videoStream.getVideoTracks()[0];
         const audioTrack = videoStream.getAudioTracks()[0];
         
-        // Record video
-        const videoStreamForRecording = new MediaStream([videoTrack]);
-        const videoRecorder = new MediaRecorder(videoStreamForRecording, {
-            mimeType: 'video/webm;codecs=vp8'
-        });
-        
-        videoRecorder.ondataavailable = (event) => {
-            if (event.data.size > 0) {
-                videoChunks.push(event.data);
-            }
-        };
+        // With the face mesh running here, only landmarks and audio go up
+        const useLandmarks = faceLandmarker !== null;
         
-        // Record audio
-        const audioStreamForRecording = new MediaStream([audioTrack]);
-        const audioRecorder = new MediaRecorder(audioStreamForRecording, {
-            mimeType: 'audio/webm'
-        });
+        // Record video and audio into one webm when the browser can; the
+        // server pulls the audio track out of it, so only one file is uploaded
+        const combined = !useLandmarks && MediaRecorder.isTypeSupported('video/webm;codecs=vp8,opus');
+        let videoRecorder = null;
+        if (!useLandmarks) {
+            const videoStreamForRecording = new MediaStream(combined ? [videoTrack, audioTrack] : [videoTrack]);
+            videoRecorder = new MediaRecorder(videoStreamForRecording, {
+                mimeType: combined ? 'video/webm;codecs=vp8,opus' : 'video/webm;codecs=vp8'
+            });
+            
+            videoRecorder.ondataavailable = (event) => {
+                if (event.data.size > 0) {
+                    videoChunks.push(event.data);
+                }
+            };
+        }
         
-        audioRecorder.ondataavailable = (event) => {
-            if (event.data.size > 0) {
-                audioChunks.push(event.data);
-            }
-        };
+        // Otherwise record audio separately
+        let audioRecorder = null;
+        if (!combined) {
+            const audioStreamForRecording = new MediaStream([audioTrack]);
+            audioRecorder = new MediaRecorder(audioStreamForRecording, {
+                mimeType: 'audio/webm'
+            });
+            
+            audioRecorder.ondataavailable = (event) => {
+                if (event.data.size > 0) {
+                    audioChunks.push(event.data);
+                }
+            };
+        }
         
-        videoRecorder.start();
-        audioRecorder.start();
+        if (videoRecorder) {
+            videoRecorder.start();
+        }
+        if (audioRecorder) {
+            audioRecorder.start();
+        }
         
         recordingStartTime = Date.now();
+        if (useLandmarks) {
+            landmarkTimer = setInterval(() => {
+                const record = landmarkRecord(videoPreview, (Date.now() - recordingStartTime) / 1000);
+                if (record) {
+                    landmarkRecords.push(record);
+                }
+            }, 1000 / LANDMARK_FPS);
+        }
         mediaRecorder = { video: videoRecorder, audio: audioRecorder };
         
         startBtn.disabled = true;
@@ -104,13 +131,24 @@ async function stopRecording() {
     status.textContent = 'processing your romantic words...';
     status.className = 'status processing';
     
+    clearInterval(landmarkTimer);
+    landmarkTimer = null;
+    
     // Stop both recorders
     const videoStopped = new Promise((resolve) => {
+        if (!mediaRecorder.video) {
+            resolve();
+            return;
+        }
         mediaRecorder.video.onstop = resolve;
         mediaRecorder.video.stop();
     });
     
     const audioStopped = new Promise((resolve) => {
+        if (!mediaRecorder.audio) {
+            resolve();
+            return;
+        }
         mediaRecorder.audio.onstop = resolve;
         mediaRecorder.audio.stop();
     });
@@ -120,7 +158,8 @@ async function stopRecording() {
     // Wait a bit for all data chunks to be available
     await new Promise(resolve => setTimeout(resolve, 500));
     
-    if (videoChunks.length === 0 || audioChunks.length === 0) {
+    const haveVisuals = mediaRecorder.video ? videoChunks.length > 0 : landmarkRecords.length > 0;
+    if (!haveVisuals || (mediaRecorder.audio && audioChunks.length === 0)) {
         status.textContent = 'oops! no recording data captured. try again babe!';
         status.className = 'status error';
         startBtn.disabled = false;
@@ -129,49 +168,188 @@ async function stopRecording() {
     }
     
     // Create blobs
-    const videoBlob = new Blob(videoChunks, { type: 'video/webm' });
-    const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
+    const videoBlob = mediaRecorder.video ? new Blob(videoChunks, { type: 'video/webm' }) : null;
+    const audioBlob = mediaRecorder.audio ? new Blob(audioChunks, { type: 'audio/webm' }) : null;
+    const landmarksBlob = mediaRecorder.video ? null : new Blob(landmarkRecords, { type: 'application/octet-stream' });
     
-    console.log(`Video size: ${(videoBlob.size / 1024 / 1024).toFixed(2)} MB`);
-    console.log(`Audio size: ${(audioBlob.size / 1024 / 1024).toFixed(2)} MB`);
+    if (videoBlob) {
+        console.log(`Video size: ${(videoBlob.size / 1024 / 1024).toFixed(2)} MB`);
+    }
+    if (landmarksBlob) {
+        console.log(`Landmarks size: ${(landmarksBlob.size / 1024).toFixed(1)} KB (${landmarkRecords.length} frames)`);
+    }
+    if (audioBlob) {
+        console.log(`Audio size: ${(audioBlob.size / 1024 / 1024).toFixed(2)} MB`);
+    }
     
     // Send to server
-    await sendToServer(videoBlob, audioBlob);
+    await sendToServer(videoBlob, audioBlob, landmarksBlob);
 }
 
-// Send video and audio to server
-async function sendToServer(videoBlob, audioBlob) {
-    const formData = new FormData();
-    formData.append('video', videoBlob, 'recording.webm');
-    formData.append('audio', audioBlob, 'recording.webm');
+// Stream the analysis: the numbers and transcription as soon as they're
+// ready, then the interpretation word by word as the LLM writes it
+async function runStream(formData) {
+    const response = await fetch('/process/stream', {
+        method: 'POST',
+        body: formData
+    });
     
-    try {
-        // Try /process first (for FastAPI), fallback to /api/process if needed
-        const apiUrl = '/process';
-        const response = await fetch(apiUrl, {
-            method: 'POST',
-            body: formData
-        });
+    // server without streaming: fall back to jobs / the blocking endpoint
+    if (response.status === 404 || response.status === 405) {
+        return null;
+    }
+    if (!response.ok) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.error || error.detail || ('Server error: ' + response.statusText));
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let data = null;
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
         
-        if (!response.ok) {
-            throw new Error('Server error: ' + response.statusText);
+        // one server-sent event per blank-line separated block
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = 'message';
+            let payload = '';
+            for (const line of block.split('\n')) {
+                if (line.startsWith('event: ')) {
+                    event = line.slice(7);
+                } else if (line.startsWith('data: ')) {
+                    payload += line.slice(6);
+                }
+            }
+            const message = JSON.parse(payload);
+            
+            if (event === 'features') {
+                data = message;
+                data.analysis = '';
+                showResults(data);
+                status.textContent = 'reading your vibe...';
+                status.className = 'status processing';
+            } else if (event === 'token') {
+                data.analysis += message.text;
+                document.getElementById('analysisText').textContent = data.analysis;
+            } else if (event === 'done') {
+                // the local score's reading when the LLM was unavailable
+                data.analysis = message.analysis;
+                document.getElementById('analysisText').textContent = data.analysis;
+            } else if (event === 'error') {
+                throw new Error(message.error);
+            }
         }
+    }
+    if (data === null) {
+        throw new Error('analysis stream ended early');
+    }
+    return data;
+}
+
+// Submit an analysis job and poll until it finishes
+async function runJob(formData) {
+    const submit = await fetch('/jobs', {
+        method: 'POST',
+        body: formData
+    });
+    
+    // server without the job API: fall back to the blocking endpoint
+    if (submit.status === 404 || submit.status === 405) {
+        return null;
+    }
+    
+    const accepted = await submit.json();
+    if (!submit.ok) {
+        throw new Error(accepted.error || ('Server error: ' + submit.statusText));
+    }
+    
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const poll = await fetch(accepted.status_url);
+        const job = await poll.json();
         
-        const data = await response.json();
+        if (job.status === 'done') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'analysis failed');
+        }
+        if (!poll.ok) {
+            throw new Error(job.error || job.detail || ('Server error: ' + poll.statusText));
+        }
+    }
+}
+
+// Display results
+function showResults(data) {
+    if (data.transcription) {
+        transcriptionDiv.innerHTML = `<h3>What you said:</h3><p>${data.transcription}</p>`;
+    }
+    
+    if (data.analysis !== undefined) {
+        analysisDiv.innerHTML = `<h3>Rizz Analysis:</h3><pre id="analysisText"></pre>`;
+        document.getElementById('analysisText').textContent = data.analysis;
+    }
+    
+    if (data.score) {
+        analysisDiv.innerHTML += `<p>rizz score: ${Math.round(data.score.rizz)}/100 (${data.score.label})</p>`;
+    }
+    
+    if (data.emotion) {
+        analysisDiv.innerHTML += `<p>dominant emotion: ${data.emotion.dominant}</p>`;
+    }
+    
+    if (data.prosody && data.prosody.pitch_hz) {
+        analysisDiv.innerHTML += `<p>voice: ${Math.round(data.prosody.pitch_hz)} Hz pitch, ${Math.round(data.prosody.voiced_ratio * 100)}% voiced</p>`;
+    }
+    
+    results.style.display = 'block';
+    status.textContent = 'your romantic analysis is ready!';
+    status.className = 'status complete';
+    startBtn.disabled = false;
+}
+
+// Send video and audio to server
+async function sendToServer(videoBlob, audioBlob, landmarksBlob) {
+    const formData = new FormData();
+    if (landmarksBlob) {
+        formData.append('landmarks', landmarksBlob, 'landmarks.bin');
+    } else {
+        formData.append('video', videoBlob, 'recording.webm');
+    }
+    if (audioBlob) {
+        formData.append('audio', audioBlob, 'recording.webm');
+    }
+    
+    try {
+        let data = await runStream(formData);
         
-        // Display results
-        if (data.transcription) {
-            transcriptionDiv.innerHTML = `<h3>What you said:</h3><p>${data.transcription}</p>`;
+        if (data === null) {
+            data = await runJob(formData);
         }
         
-        if (data.analysis) {
-            analysisDiv.innerHTML = `<h3>Rizz Analysis:</h3><pre>${data.analysis}</pre>`;
+        if (data === null) {
+            const response = await fetch('/process', {
+                method: 'POST',
+                body: formData
+            });
+            
+            if (!response.ok) {
+                throw new Error('Server error: ' + response.statusText);
+            }
+            
+            data = await response.json();
         }
         
-        results.style.display = 'block';
-        status.textContent = 'your romantic analysis is ready!';
-        status.className = 'status complete';
-        startBtn.disabled = false;
+        showResults(data);
         
     } catch (error) {
         console.error('Error sending to server:', error);
@@ -181,8 +359,135 @@ async function sendToServer(videoBlob, audioBlob) {
     }
 }
 
+// Live mode: stream frames and audio over a websocket and get rolling
+// metrics back while recording. Servers without /live fall back to upload.
+const LIVE_FPS = 8;
+const LIVE_SECONDS = 10;
+// skip a frame rather than queue it when the socket is this far behind
+const LIVE_MAX_BUFFERED = 256 * 1024;
+const TAG_FRAME = 'F'.charCodeAt(0);
+const TAG_LANDMARKS = 'L'.charCodeAt(0);
+const TAG_AUDIO = 'A'.charCodeAt(0);
+
+function openLiveSocket() {
+    return new Promise((resolve) => {
+        const protocol = location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const ws = new WebSocket(`${protocol}//${location.host}/live`);
+        ws.binaryType = 'arraybuffer';
+        ws.onopen = () => resolve(ws);
+        ws.onerror = () => resolve(null);
+    });
+}
+
+function sendTagged(ws, tag, buffer) {
+    const message = new Uint8Array(buffer.byteLength + 1);
+    message[0] = tag;
+    message.set(new Uint8Array(buffer), 1);
+    ws.send(message);
+}
+
+async function startLive() {
+    startBtn.disabled = true;
+    const ws = await openLiveSocket();
+    if (!ws) {
+        startRecording();
+        return;
+    }
+    
+    results.style.display = 'none';
+    status.textContent = 'listening live... say something sweet!';
+    status.className = 'status recording';
+    
+    // Webcam frames, at most LIVE_FPS and only while the socket keeps up:
+    // landmarks when the browser face mesh is loaded, JPEG otherwise
+    videoCanvas.width = videoPreview.videoWidth || 640;
+    videoCanvas.height = videoPreview.videoHeight || 480;
+    const context = videoCanvas.getContext('2d');
+    const liveStart = Date.now();
+    const frameTimer = setInterval(() => {
+        if (ws.readyState !== WebSocket.OPEN || ws.bufferedAmount > LIVE_MAX_BUFFERED) {
+            return;
+        }
+        if (faceLandmarker) {
+            const record = landmarkRecord(videoPreview, (Date.now() - liveStart) / 1000);
+            if (record) {
+                sendTagged(ws, TAG_LANDMARKS, record);
+            }
+            return;
+        }
+        context.drawImage(videoPreview, 0, 0, videoCanvas.width, videoCanvas.height);
+        videoCanvas.toBlob(async (blob) => {
+            if (blob && ws.readyState === WebSocket.OPEN) {
+                sendTagged(ws, TAG_FRAME, await blob.arrayBuffer());
+            }
+        }, 'image/jpeg', 0.7);
+    }, 1000 / LIVE_FPS);
+    
+    // Microphone as 16 kHz float32 PCM, what whisper takes
+    const audioContext = new AudioContext({ sampleRate: 16000 });
+    const source = audioContext.createMediaStreamSource(new MediaStream(videoStream.getAudioTracks()));
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+    processor.onaudioprocess = (event) => {
+        if (ws.readyState === WebSocket.OPEN) {
+            sendTagged(ws, TAG_AUDIO, event.inputBuffer.getChannelData(0).slice().buffer);
+        }
+    };
+    source.connect(processor);
+    processor.connect(audioContext.destination);
+    
+    const stopCapture = () => {
+        clearInterval(frameTimer);
+        processor.disconnect();
+        source.disconnect();
+        audioContext.close();
+    };
+    
+    let timeLeft = LIVE_SECONDS;
+    startBtn.textContent = `live... (${timeLeft} seconds)`;
+    const countdown = setInterval(() => {
+        timeLeft--;
+        startBtn.textContent = `live... (${timeLeft} seconds)`;
+        if (timeLeft <= 0) {
+            clearInterval(countdown);
+            stopCapture();
+            startBtn.textContent = 'begin your love letter';
+            status.textContent = 'processing your romantic words...';
+            status.className = 'status processing';
+            ws.send(JSON.stringify({ type: 'end' }));
+        }
+    }, 1000);
+    
+    ws.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.type === 'metrics') {
+            if (data.current_aus && timeLeft > 0) {
+                status.textContent = `live... smile ${data.current_aus.AU12.toFixed(2)}, ${data.frames.with_face} frames read`;
+            }
+        } else if (data.type === 'result') {
+            if (data.error) {
+                status.textContent = 'error processing: ' + data.error;
+                status.className = 'status error';
+                startBtn.disabled = false;
+            } else {
+                showResults(data);
+            }
+        }
+    };
+    
+    ws.onclose = () => {
+        clearInterval(countdown);
+        if (timeLeft > 0) {
+            stopCapture();
+            status.textContent = 'live connection closed, try again!';
+            status.className = 'status error';
+            startBtn.textContent = 'begin your love letter';
+            startBtn.disabled = false;
+        }
+    };
+}
+
 // Event listeners
-startBtn.addEventListener('click', startRecording);
+startBtn.addEventListener('click', startLive);
 
 // Initialize on page load
 initCamera();
@@ -1,13 +1,10 @@
-from flask import Flask, request, jsonify, send_from_directory
-import cv2
-import numpy as np
-import mediapipe as mp
-import whisper
-import onnxruntime as ort
-import time
+from flask import Flask, Response, request, jsonify, send_from_directory
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
 import os
-import tempfile
 import sys
+import threading
+from functools import partial
 from pathlib import Path
 
 # Load environment variables from .env file if it exists (for local development)
@@ -19,93 +16,109 @@ except ImportError:
     pass  # python-dotenv not installed, that's okay
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
-from au_feature import compute_aus
-from metrics import compute_metrics
-from openai_call import interpret_expression
+from startup import readiness, start_warmup, timed
+with timed("import pipeline (cv2, av)"):
+    from video_pipeline import VIDEO_SAMPLING, run_video_pipeline
+    from audio_demux import WHISPER_SAMPLE_RATE, load_audio_track
+from analysis_runner import BranchTimeout, analyze
+from vad import NO_SPEECH, trim_silence
+from audio_analyzer import analyze_prosody
+from llm_gateway import LLMError, gateway
+from rizz_score import describe, rizz_score
+from model_pool import PoolTimeout
+from models import POOL_WAIT, TRANSCRIBER, emotion_pool, face_mesh_pool, pool_stats, whisper_pool
+from digests import array_digest, file_digest
+from result_cache import cache_stats, transcription_cache, video_cache, video_key
+from uploads import MAX_AUDIO_BYTES, MAX_LANDMARK_BYTES, MAX_REQUEST_BYTES, MAX_VIDEO_BYTES, UploadTooLarge, save_stream
+from feature_engine import average_landmark_payload
+from landmark_codec import LandmarkPayloadError
+from jobs import DONE, FAILED, JobFailed, QueueFull, make_job_backend
+with timed("import openai"):
+    from openai_call import interpret_or_describe, stream_interpretation
 
 app = Flask(__name__, static_folder='.', static_url_path='')
+# werkzeug rejects bigger bodies from Content-Length before parsing them
+app.config["MAX_CONTENT_LENGTH"] = MAX_REQUEST_BYTES
 
-whisper_model = whisper.load_model("tiny.en")
-print("whisper model loaded")
-
-emotion_session = ort.InferenceSession(str(Path(__file__).parent.parent.parent / "emotion.onnx"))
-input_name = emotion_session.get_inputs()[0].name
-output_name = emotion_session.get_outputs()[0].name
-EMOTIONS = ["neutral", "happiness", "surprise", "sadness", "anger", "disgust", "fear", "contempt"]
-print("emotion model loaded")
-
-mp_face = mp.solutions.face_mesh
-face_mesh = mp_face.FaceMesh(max_num_faces=1, refine_landmarks=True)
-
-def avg_dict_list(dict_list):
-    if not dict_list:
-        return {}
-    keys = dict_list[0].keys()
-    return {
-        k: float(np.mean([d[k] for d in dict_list]))
-        for k in keys
-    }
-
-def process_video(video_path):
-    cap = cv2.VideoCapture(video_path)
-    
-    if not cap.isOpened():
-        print(f"could not open video file directly")
-        return None, None
-    
-    session_data = {
-        "aus": [],
-        "metrics": [],
-        "timestamps": [],
-    }
-    
-    start_time = time.time()
-    frame_count = 0
-    frames_processed = 0
+# models live in per-process pools; each request checks out its own instance,
+# so gunicorn threads never share a FaceMesh tracker or whisper model. the
+# pools load lazily; warm-up fills them in the background so boot doesn't wait
+MODEL_POOLS = (face_mesh_pool, emotion_pool, whisper_pool)
+start_warmup(MODEL_POOLS)
+
+# long analyses can run as background jobs: POST /jobs, then poll /jobs/<id>
+job_queue = make_job_backend()
+
+# an open /jobs/<id>/events stream holds a gunicorn thread (the Procfile runs
+# 2) until its job finishes, so only this many at once; the rest get a 503
+# and poll /jobs/<id> instead
+JOB_EVENT_STREAMS = int(os.environ.get("JOB_EVENT_STREAMS", 1))
+event_streams = threading.BoundedSemaphore(JOB_EVENT_STREAMS)
+
+def process_video(video_path, cancel=None):
+    # resubmitted clips (retries, double clicks) skip decode and face mesh
+    key = video_key(file_digest(video_path), VIDEO_SAMPLING)
+    cached = video_cache.get(key)
+    if cached is not None:
+        print("Video analysis served from cache")
+        return cached
     
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        if frame_count % 5 != 0:
-            continue
-        
-        frame = cv2.flip(frame, 1)
-        h, w, _ = frame.shape
-        
-        results = face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        
-        if results.multi_face_landmarks:
-            landmarks = results.multi_face_landmarks[0].landmark
-            aus = compute_aus(landmarks, frame.shape[1], frame.shape[0])
-            metrics = compute_metrics(landmarks, frame.shape[1], frame.shape[0])
-            
-            if isinstance(aus, dict) and isinstance(metrics, dict):
-                session_data["aus"].append(aus)
-                session_data["metrics"].append(metrics)
-                session_data["timestamps"].append(time.time() - start_time)
-                frames_processed += 1
+    # bounded waits: a busy server answers 503 instead of parking the request
+    with face_mesh_pool.checkout(POOL_WAIT) as face_mesh, emotion_pool.checkout(POOL_WAIT) as emotion_session:
+        avg_aus, avg_metrics, emotions, stats = run_video_pipeline(
+            video_path, face_mesh, cancel=cancel, emotion_session=emotion_session, **VIDEO_SAMPLING
+        )
     
-    cap.release()
+    if not stats["opened"]:
+        print(f"could not open video file directly")
+        return None, None, None
     
-    if not session_data["aus"]:
-        print(f"Warning: No face detected in {frames_processed} processed frames")
-        return None, None
+    print(f"Video pipeline stages: {stats['stages']} (wall {stats['wall_seconds']}s)")
     
-    avg_aus = avg_dict_list(session_data["aus"])
-    avg_metrics = avg_dict_list(session_data["metrics"])
+    if avg_aus is None:
+        print(f"Warning: No face detected in {stats['frames_sampled']} sampled frames")
+        return None, None, None
     
-    print(f"Processed {frames_processed} frames with face detection")
-    return avg_aus, avg_metrics
+    print(f"Processed {stats['frames_with_face']} frames with face detection")
+    video_cache.set(key, (avg_aus, avg_metrics, emotions))
+    return avg_aus, avg_metrics, emotions
 
-def process_audio(audio_path):
+def process_landmarks(landmarks_path, cancel=None):
+    # browser-side face mesh: no decode, no mediapipe, just the feature math
+    with open(landmarks_path, "rb") as f:
+        avg_aus, avg_metrics = average_landmark_payload(f.read())
+    if avg_aus is None:
+        print("Warning: landmark upload has no frames")
+    return avg_aus, avg_metrics, None
+
+ANALYZERS = {"video": process_video, "landmarks": process_landmarks}
+
+def process_audio(audio):
+    # audio: a file path, or a 16 kHz float32 array already decoded in-process
+    digest = file_digest(audio) if isinstance(audio, str) else array_digest(audio)
+    key = f"{TRANSCRIBER}-{digest}"
+    cached = transcription_cache.get(key)
+    if cached is not None:
+        print("Transcription served from cache")
+        return cached
     try:
-        result = whisper_model.transcribe(audio_path, fp16=False, without_timestamps=True)
-        transcription = result["text"].strip()
+        if isinstance(audio, str):
+            # decode here so VAD can see it; whisper gets the path if PyAV can't
+            decoded = load_audio_track(audio)
+            if decoded is not None:
+                audio = decoded
+        if not isinstance(audio, str):
+            audio = trim_silence(audio)
+            if audio is None:
+                print("No speech detected, skipping transcription")
+                transcription_cache.set(key, NO_SPEECH)
+                return NO_SPEECH
+        with whisper_pool.checkout() as transcriber:
+            text = transcriber.transcribe(audio)
+        transcription = text
         if not transcription:
-            return "No speech detected in audio."
+            transcription = NO_SPEECH
+        transcription_cache.set(key, transcription)
         return transcription
     except Exception as e:
         print(f"Error transcribing audio: {e}")
@@ -113,6 +126,43 @@ def process_audio(audio_path):
         traceback.print_exc()
         return f"Error transcribing audio: {str(e)}"
 
+def process_audio_upload(video_path, audio_path=None):
+    '''(transcription, prosody) for a request; prosody is None if the audio can't be decoded'''
+    # the browser's webm carries its own audio track: demux it in-process and
+    # skip both the separate audio upload and whisper's ffmpeg subprocess
+    audio = load_audio_track(video_path) if video_path is not None else None
+    if audio is None:
+        if audio_path is None:
+            return "No audio track found in video.", None
+        audio = load_audio_track(audio_path)
+        if audio is None:
+            return process_audio(audio_path), None
+    return process_audio(audio), analyze_prosody(audio, WHISPER_SAMPLE_RATE)
+
+def audio_timeout_result(message):
+    return message, None
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(e):
+    return jsonify({"error": "Upload too large"}), 413
+
+@app.errorhandler(UploadTooLarge)
+def upload_too_large(e):
+    return jsonify({"error": str(e)}), 413
+
+@app.route("/health")
+def health():
+    return jsonify({"status": "ok"})
+
+@app.route("/ready")
+def ready():
+    is_ready, payload = readiness(MODEL_POOLS)
+    return jsonify(payload), 200 if is_ready else 503
+
+@app.route("/stats")
+def stats():
+    return jsonify({"pools": pool_stats(), "jobs": job_queue.stats(), "caches": cache_stats(), "llm": gateway.stats()})
+
 @app.route("/")
 def index():
     return send_from_directory('.', 'index.html')
@@ -121,59 +171,217 @@ def index():
 def static_files(path):
     return send_from_directory('.', path)
 
-@app.route("/process", methods=["POST"])
-def process():
+def save_uploads():
+    '''
+    save the request's files; returns (media_path, audio_path, kind) with
+    media_path the video, or the landmark payload when kind is "landmarks"
+    '''
+    # chunked copy to disk with a per-file cap; bails out as soon as it's crossed
+    if 'landmarks' in request.files:
+        media_path = save_stream(request.files['landmarks'].stream.read, "landmarks", MAX_LANDMARK_BYTES, suffix=".lmk")
+        kind = "landmarks"
+    else:
+        media_path = save_stream(request.files['video'].stream.read, "video", MAX_VIDEO_BYTES)
+        kind = "video"
+    audio_path = None
+    # audio is optional when the video has its own audio track
+    if 'audio' in request.files:
+        try:
+            audio_path = save_stream(request.files['audio'].stream.read, "audio", MAX_AUDIO_BYTES)
+        except BaseException:
+            os.unlink(media_path)
+            raise
+    return media_path, audio_path, kind
+
+def run_analysis(media_path, audio_path, kind="video", interpret=True):
+    '''
+    analyze saved uploads and delete them; returns (payload, http status).
+    "score" is computed locally; with interpret=False the payload stops short
+    of the LLM "analysis".
+    '''
     try:
-        if 'video' not in request.files or 'audio' not in request.files:
-            return jsonify({"error": "Missing video or audio file"}), 400
-        
-        video_file = request.files['video']
-        audio_file = request.files['audio']
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as video_temp:
-            video_path = video_temp.name
-            video_file.save(video_path)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.webm') as audio_temp:
-            audio_path = audio_temp.name
-            audio_file.save(audio_path)
-        
+        print(f"Transcribing audio and analyzing {kind}...")
         try:
-            print("Transcribing audio...")
-            transcription = process_audio(audio_path)
-            print(f"Transcription: {transcription}")
-            
-            avg_aus, avg_metrics = process_video(video_path)
-            
-            if avg_aus is None or avg_metrics is None:
-                return jsonify({
-                    "error": "Could not detect face in video. Please ensure your face is visible.",
-                    "transcription": transcription
-                }), 400
+            (transcription, prosody), (avg_aus, avg_metrics, emotions), timings = analyze(
+                partial(process_audio_upload, media_path if kind == "video" else None), audio_path,
+                ANALYZERS[kind], media_path,
+                audio_fallback=audio_timeout_result,
+            )
+        except BranchTimeout as e:
+            return {"error": str(e)}, 504
+        except PoolTimeout as e:
+            return {"error": f"Server busy: {e}"}, 503
+        except LandmarkPayloadError as e:
+            return {"error": str(e)}, 400
+        print(f"Transcription: {transcription}")
+        print(f"Analysis timings: {timings}")
         
+        if avg_aus is None or avg_metrics is None:
+            return {
+                "error": "Could not detect face in video. Please ensure your face is visible.",
+                "transcription": transcription
+            }, 400
+    
+        payload = {
+            "transcription": transcription,
+            "aus": avg_aus,
+            "metrics": avg_metrics,
+            "emotion": emotions,
+            "prosody": prosody,
+            "score": rizz_score(avg_aus, avg_metrics, prosody)
+        }
+        if interpret:
             print("Generating analysis...")
-            analysis = interpret_expression(avg_aus, avg_metrics)
-            
-            return jsonify({
-                "transcription": transcription,
-                "analysis": analysis,
-                "aus": avg_aus,
-                "metrics": avg_metrics
-            })
-            
-        finally:
+            payload["analysis"] = interpret_or_describe(avg_aus, avg_metrics, payload["score"])
+        return payload, 200
+        
+    finally:
+        for path in (media_path, audio_path):
+            if path is None:
+                continue
             try:
-                os.unlink(video_path)
-                os.unlink(audio_path)
+                os.unlink(path)
             except:
                 pass
-                
+
+def run_analysis_job(media_path, audio_path, kind="video"):
+    payload, status = run_analysis(media_path, audio_path, kind)
+    if status != 200:
+        raise JobFailed(payload["error"], payload)
+    return payload
+
+@app.route("/process", methods=["POST"])
+def process():
+    # ?interpret=false skips the LLM and answers from the local score alone
+    interpret = request.args.get("interpret", "true").lower() not in ("false", "0")
+    try:
+        if 'video' not in request.files and 'landmarks' not in request.files:
+            return jsonify({"error": "Missing video or landmarks file"}), 400
+        
+        media_path, audio_path, kind = save_uploads()
+        payload, status = run_analysis(media_path, audio_path, kind, interpret)
+        if status == 200 and not interpret:
+            payload["analysis"] = describe(payload["score"])
+        return jsonify(payload), status
+    
+    except (UploadTooLarge, RequestEntityTooLarge):
+        raise
     except Exception as e:
         print(f"Error processing request: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route("/process/stream", methods=["POST"])
+def process_stream():
+    '''
+    /process as server-sent events: "features" with everything but the
+    analysis as soon as it's ready, "token" events as the LLM writes, then
+    "done" with the full analysis. failures before the stream starts get the
+    same responses as /process. if the LLM fails before its first token,
+    "done" carries the local score's reading instead; a failure mid-stream
+    is an "error" event.
+    '''
+    try:
+        if 'video' not in request.files and 'landmarks' not in request.files:
+            return jsonify({"error": "Missing video or landmarks file"}), 400
+        
+        media_path, audio_path, kind = save_uploads()
+        payload, status = run_analysis(media_path, audio_path, kind, interpret=False)
+        if status != 200:
+            return jsonify(payload), status
+    
+    except (UploadTooLarge, RequestEntityTooLarge):
+        raise
+    except Exception as e:
+        print(f"Error processing request: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    
+    def events():
+        yield sse("features", payload)
+        parts = []
+        try:
+            for delta in stream_interpretation(payload["aus"], payload["metrics"]):
+                parts.append(delta)
+                yield sse("token", {"text": delta})
+        except LLMError as e:
+            if parts:
+                print(f"Error streaming analysis: {e}")
+                yield sse("error", {"error": str(e)})
+                return
+            print(f"LLM unavailable, using the local score: {e}")
+            parts = [describe(payload["score"])]
+        except Exception as e:
+            print(f"Error streaming analysis: {e}")
+            yield sse("error", {"error": str(e)})
+            return
+        yield sse("done", {"analysis": "".join(parts)})
+    
+    # X-Accel-Buffering: proxies would otherwise hold tokens back
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    if 'video' not in request.files and 'landmarks' not in request.files:
+        return jsonify({"error": "Missing video or landmarks file"}), 400
+    
+    media_path, audio_path, kind = save_uploads()
+    try:
+        job_id = job_queue.submit(run_analysis_job, media_path, audio_path, kind)
+    except QueueFull as e:
+        for path in (media_path, audio_path):
+            if path is None:
+                continue
+            try:
+                os.unlink(path)
+            except:
+                pass
+        return jsonify({"error": f"Server busy: {e}"}), 503, {"Retry-After": "5"}
+    
+    return jsonify({"job_id": job_id, "status_url": f"/jobs/{job_id}"}), 202
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id):
+    if job_queue.status(job_id) is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if not event_streams.acquire(blocking=False):
+        return jsonify({"error": "Too many event streams, poll /jobs/<id>"}), 503, {"Retry-After": "5"}
+    
+    def stream():
+        # one server-sent event per status change, until the job finishes;
+        # a quiet wait ends in a comment line that only keeps proxies from
+        # closing the connection
+        last = None
+        while True:
+            job = job_queue.wait(job_id, timeout=15)
+            if job is None:
+                return
+            if job["status"] == last:
+                yield ": keepalive\n\n"
+                continue
+            last = job["status"]
+            yield f"data: {json.dumps(job)}\n\n"
+            if job["status"] in (DONE, FAILED):
+                return
+    
+    response = Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+    # runs when the stream ends or the client goes away, started or not
+    response.call_on_close(event_streams.release)
+    return response
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_ENV") == "development"